@@ -3,6 +3,14 @@ import geopandas as gpd
 import plotly.express as px
 from dash import Dash, dcc, html, Input, Output
 
+from pipeline.data import CACHE_VERSION, DATASETS, load_listings, sources_digest
+from pipeline.figure_cache import FigureCache
+from pipeline.geometry import ParishGeometry
+from pipeline.lazy import LazyRegistry, warm_up_enabled
+from pipeline.reducers import mode_by
+from pipeline.review_summary import load_review_summary
+from pipeline.shared import shared_frame
+
 COLORS = {
     'background': '#fdf6e3',
     'text': '#657b83',
@@ -17,22 +25,24 @@ app = Dash(__name__, external_stylesheets=[
     "https://fonts.googleapis.com/css2?family=Poppins:wght@400;600&display=swap",
 ], suppress_callback_exceptions=True)
 
-# --- Dashboard 1: Nationality & Parish ---
-gdf = gpd.read_file("./data/lisbon_parishes.geojson")
-quarterly_language_data = pd.read_csv("data/parish_data_quarterly.csv")
-
+# Every tab's data and figures are built the first time the tab is rendered
+# (or by the background warm-up), not at import, so the server answers
+# straight away after a deploy.
+tabs = LazyRegistry()
 
-def mode(x):
-    return x.mode()[0] if not x.empty else None
+# bump whenever a cached callback returns something different for the same
+# inputs, so figures pickled under AIRBNB_FIGURE_CACHE_DIR by an earlier
+# deploy are not served by the new code
+FIGURES_VERSION = 1
 
+# Callback outputs depend only on their inputs, the data files and the
+# version of the callbacks, so they are shared across users (and, with
+# AIRBNB_FIGURE_CACHE_DIR set, across workers)
+figure_cache = FigureCache(version=lambda: f'v{CACHE_VERSION}.{FIGURES_VERSION}-' + sources_digest([
+    DATASETS['listings']['file'], DATASETS['reviews']['file'],
+    'parish_data_quarterly.csv', 'lisbon_parishes.geojson'
+]))
 
-aggregated_df = quarterly_language_data.groupby('parish_id').agg(
-    total_reviews=('num_reviews', 'sum'),
-    language=('language', mode)
-).reset_index()
-
-merged_df = gdf.merge(aggregated_df, left_on="id", right_on='parish_id')
-unique_languages = merged_df['language'].unique().tolist()
 pastel_colors = ['#f6c5af', '#b5d4e5', '#f2e1c2', '#c1d9ce', '#e5c7d3']
 
 language_color_map = {
@@ -46,86 +56,138 @@ language_color_map = {
 color_discrete_map = language_color_map
 
 
-fig_map = px.choropleth_map(
-    merged_df,
-    geojson=merged_df.geometry,
-    locations=merged_df.index,
-    color="language",
-    color_discrete_map=color_discrete_map,
-    center={"lat": 38.8, "lon": -9.1500},
-    hover_name="name",
-    zoom=10,
-    map_style="carto-positron",
-    hover_data=["language"]
-)
-fig_map.update_layout(
-    margin={'r': 0, 'l': 0, 'b': 0, 't': 10},
-    paper_bgcolor=COLORS['background'],
-    plot_bgcolor=COLORS['background'],
-    font={'family': 'Roboto'},
-    hoverlabel={'font_size': 14, 'font_family': 'Roboto'}
-)
+# --- Dashboard 1: Nationality & Parish ---
+@tabs.register('parishes')
+def load_parishes():
+    return gpd.read_file("./data/lisbon_parishes.geojson")
 
 
-quarterly_reviews = quarterly_language_data.groupby('quarter')['num_reviews'].sum().reset_index()
-fig_bar = px.bar(
-    quarterly_reviews,
-    x='quarter',
-    y='num_reviews',
-    color_discrete_sequence=['#f6c5af']  
-)
+# polygons are served once from their own URL instead of inside every figure;
+# the route is registered now and reads the file on its first request
+parish_geojson_url = ParishGeometry(lambda: tabs['parishes']).serve(app)
+
+
+@tabs.register('tab1')
+def build_tab1():
+    gdf = tabs['parishes']
+    quarterly_language_data = pd.read_csv("data/parish_data_quarterly.csv")
+
+    aggregated_df = quarterly_language_data.groupby('parish_id').agg(
+        total_reviews=('num_reviews', 'sum')
+    ).join(mode_by(quarterly_language_data, 'parish_id')).reset_index()
+
+    merged_df = gdf.merge(aggregated_df, left_on="id", right_on='parish_id')
+
+    fig_map = px.choropleth_map(
+        merged_df,
+        geojson=parish_geojson_url,
+        locations='parish_id',
+        featureidkey='id',
+        color="language",
+        color_discrete_map=color_discrete_map,
+        center={"lat": 38.8, "lon": -9.1500},
+        hover_name="name",
+        zoom=10,
+        map_style="carto-positron",
+        hover_data=["language"]
+    )
+    fig_map.update_layout(
+        margin={'r': 0, 'l': 0, 'b': 0, 't': 10},
+        paper_bgcolor=COLORS['background'],
+        plot_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        hoverlabel={'font_size': 14, 'font_family': 'Roboto'}
+    )
 
-fig_bar.update_layout(
-    margin={'r': 20, 'l': 20, 'b': 20, 't': 30},
-    paper_bgcolor=COLORS['background'],
-    plot_bgcolor=COLORS['background'],
-    font={'family': 'Roboto'},
-    hoverlabel={'font_size': 14, 'font_family': 'Roboto'},
-    xaxis={'gridcolor': '#eee'},
-    yaxis={'gridcolor': '#eee'}
-)
+
+    quarterly_reviews = quarterly_language_data.groupby('quarter')['num_reviews'].sum().reset_index()
+    fig_bar = px.bar(
+        quarterly_reviews,
+        x='quarter',
+        y='num_reviews',
+        color_discrete_sequence=['#f6c5af']  
+    )
+
+    fig_bar.update_layout(
+        margin={'r': 20, 'l': 20, 'b': 20, 't': 30},
+        paper_bgcolor=COLORS['background'],
+        plot_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        hoverlabel={'font_size': 14, 'font_family': 'Roboto'},
+        xaxis={'gridcolor': '#eee'},
+        yaxis={'gridcolor': '#eee'}
+    )
+    return {'fig_map': fig_map, 'fig_bar': fig_bar}
 
 
 # --- Dashboard 2: Price Map ---
-listings_df = pd.read_csv('data/listings.csv.gz', compression='gzip')
-listings_df['price'] = listings_df['price'].str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(
-    float)
-listings_df = listings_df.dropna(subset=['latitude', 'longitude', 'price'])
-
-fig_price = px.scatter_map(
-    listings_df,
-    lat='latitude',
-    lon='longitude',
-    color='price',
-    color_continuous_scale=['#f6c5af', '#b5d4e5', '#f2e1c2', '#c1d9ce', '#e5c7d3'],
-    size_max=15,
-    zoom=12,
-    title='Airbnb Listings in Lisbon - Price Distribution',
-    hover_name='name',
-    hover_data=['room_type', 'neighbourhood'],
-    map_style="carto-positron"
-)
-fig_price.update_layout(
-    margin={'r': 0, 't': 40, 'l': 0, 'b': 0},
-    paper_bgcolor=COLORS['background'],
-    font={'family': 'Roboto'},
-    title=None
-)
+# listings are shared by tabs 2 and 3 and loaded once for both
+@tabs.register('listings')
+def load_listings_once():
+    return load_listings()
+
+
+@tabs.register('tab2')
+def build_tab2():
+    # one read-only copy for all workers when AIRBNB_SHARED_DATA is set
+    listings_df = shared_frame(
+        'price_map_listings',
+        [DATASETS['listings']['file']],
+        lambda: tabs['listings'].dropna(subset=['latitude', 'longitude', 'price'])[
+            ['latitude', 'longitude', 'price', 'name', 'room_type', 'neighbourhood']
+        ]
+    )
+
+    fig_price = px.scatter_map(
+        listings_df,
+        lat='latitude',
+        lon='longitude',
+        color='price',
+        color_continuous_scale=['#f6c5af', '#b5d4e5', '#f2e1c2', '#c1d9ce', '#e5c7d3'],
+        size_max=15,
+        zoom=12,
+        title='Airbnb Listings in Lisbon - Price Distribution',
+        hover_name='name',
+        hover_data=['room_type', 'neighbourhood'],
+        map_style="carto-positron"
+    )
+    fig_price.update_layout(
+        margin={'r': 0, 't': 40, 'l': 0, 'b': 0},
+        paper_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        title=None
+    )
+    return {'fig_price': fig_price}
+
 
 # --- Dashboard 3: Price vs Reviews Map com Slider ---
-reviews = pd.read_csv("data/reviews.csv.gz", compression="gzip")
+PRICE_REVIEW_COLUMNS = ['latitude', 'longitude', 'avg_price', 'review_count', 'name']
+
+
+def price_review_data():
+    listings_detailed = tabs['listings']
+    avg_price = listings_detailed.groupby('id')['price'].mean().reset_index()
+    avg_price.rename(columns={'id': 'listing_id', 'price': 'avg_price'}, inplace=True)
 
-listings_detailed = pd.read_csv("data/listings.csv.gz", compression="gzip")
-listings_detailed['price'] = listings_detailed['price'].str.replace('$', '').str.replace(',', '').astype(float)
-avg_price = listings_detailed.groupby('id')['price'].mean().reset_index()
-avg_price.rename(columns={'id': 'listing_id', 'price': 'avg_price'}, inplace=True)
+    # per-listing review counts precomputed from reviews.csv.gz; the reviews
+    # themselves are never loaded by the dashboard
+    review_counts = load_review_summary(columns=['listing_id', 'review_count'])
 
-review_counts = reviews['listing_id'].value_counts().reset_index()
-review_counts.columns = ['listing_id', 'review_count']
+    merged_data = pd.merge(listings_detailed, avg_price, left_on='id', right_on='listing_id', how='left')
+    merged_data = pd.merge(merged_data, review_counts, left_on='id', right_on='listing_id', how='left')
+    merged_data['review_count'] = merged_data['review_count'].fillna(0)
+    return merged_data[PRICE_REVIEW_COLUMNS]
 
-merged_data = pd.merge(listings_detailed, avg_price, left_on='id', right_on='listing_id', how='left')
-merged_data = pd.merge(merged_data, review_counts, left_on='id', right_on='listing_id', how='left')
-merged_data['review_count'] = merged_data['review_count'].fillna(0)
+
+@tabs.register('tab3')
+def build_tab3():
+    # one read-only copy for all workers when AIRBNB_SHARED_DATA is set
+    merged_data = shared_frame(
+        'price_review_listings',
+        [DATASETS['listings']['file'], DATASETS['reviews']['file']],
+        price_review_data
+    )
+    return {'merged_data': merged_data, 'max_reviews': int(merged_data['review_count'].max())}
 
 # --- Layout com abas ---
 app.layout = html.Div([
@@ -236,6 +298,7 @@ app.layout = html.Div([
     Output('tabs-content', 'children'),
     Input('tabs', 'value')
 )
+@figure_cache.memoize
 def render_tab(tab):
     title_style = {
         'font-family': 'Poppins',
@@ -246,17 +309,20 @@ def render_tab(tab):
     }
 
     if tab == 'tab1':
+        data = tabs['tab1']
         return html.Div([
             html.P("By nationality and parish (Region of Lisbon)", style=title_style),
-            dcc.Graph(figure=fig_map, style={'height': '60vh'}),
-            dcc.Graph(figure=fig_bar, style={'height': '35vh'})
+            dcc.Graph(figure=data['fig_map'], style={'height': '60vh'}),
+            dcc.Graph(figure=data['fig_bar'], style={'height': '35vh'})
         ])
     elif tab == 'tab2':
+        data = tabs['tab2']
         return html.Div([
             html.P("Airbnb Price Distribution", style=title_style),
-            dcc.Graph(figure=fig_price)
+            dcc.Graph(figure=data['fig_price'])
         ])
     elif tab == 'tab3':
+        data = tabs['tab3']
         return html.Div([
             html.P("Airbnb Listings (Filtered by Review Count)", style=title_style),
             dcc.Graph(id='airbnb-map'),
@@ -271,12 +337,12 @@ def render_tab(tab):
                 dcc.Slider(
                     id='review-slider',
                     min=0,
-                    max=int(merged_data['review_count'].max()),
+                    max=data['max_reviews'],
                     value=0,
                     step=1,
                     marks={i: str(i) for i in range(
-                        0, int(merged_data['review_count'].max()) + 1,
-                        max(1, int(merged_data['review_count'].max() / 10))
+                        0, data['max_reviews'] + 1,
+                        max(1, int(data['max_reviews'] / 10))
                     )}
                 ),
             ], style={'width': '80%', 'margin': 'auto'})
@@ -287,7 +353,9 @@ def render_tab(tab):
     Output('airbnb-map', 'figure'),
     Input('review-slider', 'value')
 )
+@figure_cache.memoize
 def update_map(review_threshold):
+    merged_data = tabs['tab3']['merged_data']
     filtered_data = merged_data[merged_data['review_count'] >= review_threshold]
 
     fig = px.scatter_map(
@@ -304,7 +372,7 @@ def update_map(review_threshold):
     )
 
     fig.update_layout(
-        mapbox_bounds={
+        map_bounds={
             "west": filtered_data['longitude'].min() - 0.05,
             "east": filtered_data['longitude'].max() + 0.05,
             "south": filtered_data['latitude'].min() - 0.05,
@@ -315,5 +383,15 @@ def update_map(review_threshold):
     return fig
 
 
+# WSGI entry point; with AIRBNB_WARM_UP=1 every worker builds the tabs in
+# the background from its first request on
+server = app.server
+if warm_up_enabled():
+    tabs.warm_on_first_request(server)
+
+
 if __name__ == '__main__':
+    # warm up once the server answers its first request, in the serving
+    # process only (not in the debug reloader's file watcher)
+    tabs.warm_on_first_request(server)
     app.run(debug=True)
\ No newline at end of file
@@ -3,40 +3,44 @@ from dash import Dash, html, dcc, Output, Input
 import geopandas as gpd
 import pandas as pd
 
+from pipeline.geometry import ParishGeometry
+from pipeline.language_cube import LanguageCube
+from pipeline.map_figures import language_choropleth, language_choropleth_patch
+from pipeline.reducers import mode_by
+
 # Load the GeoJSON and CSV data
 gdf = gpd.read_file("./data/lisbon_parishes.geojson")
 quarterly_language_data = pd.read_csv("data/parish_data_quarterly.csv")
 
-def mode(x):
-    return x.mode()[0] if not x.empty else None  # Handle empty groups
-
 aggregated_df = quarterly_language_data.groupby('parish_id').agg(
-    total_reviews=('num_reviews', 'sum'),
-    language=('language', mode)
-).reset_index()
+    total_reviews=('num_reviews', 'sum')
+).join(mode_by(quarterly_language_data, 'parish_id')).reset_index()
 
 # Merge the dataframes based on the common 'id' column
 merged_df = gdf.merge(aggregated_df, left_on="id", right_on='parish_id')
+language_cube = LanguageCube(quarterly_language_data, parish_ids=merged_df['parish_id'])
 
 app = Dash()
 
+# polygons are served once from their own URL instead of inside every figure
+parish_geojson_url = ParishGeometry(gdf).serve(app)
+
 # Initial choropleth map
 
 # Create the initial choropleth map
 unique_languages = merged_df['language'].unique().tolist()
 color_discrete_map = {lang: px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)] for i, lang in enumerate(unique_languages)}
 
-fig_map = px.choropleth_map(
-    merged_df, 
-    geojson=merged_df.geometry, 
-    locations=merged_df.index,
-    color="language",
-    color_discrete_map=color_discrete_map,
+fig_map = language_choropleth(
+    parish_geojson_url,
+    merged_df['parish_id'],
+    merged_df['language'],
+    merged_df['name'],
+    language_cube.languages,
+    color_discrete_map,
     center={"lat": 38.8, "lon": -9.1500},  # Lisbon's coordinates,
-    hover_name="name",
     zoom=10,
-    map_style="carto-positron",
-    hover_data=["language"]
+    style="carto-positron"
 )
 
 fig_map.update_layout(
@@ -67,50 +71,25 @@ app.layout = html.Div(
     ]
 )
 
+# Only the per-language trace arrays are sent back; the map layout and the
+# polygons stay on the client
 @app.callback(
     Output('map-graph', 'figure'),
-    Input('bar-graph', 'selectedData')
+    Input('bar-graph', 'selectedData'),
+    prevent_initial_call=True
 )
 def update_map(selectedData):
+    selected_quarters = None
     if selectedData and selectedData['points']:
         selected_quarters = [point['x'] for point in selectedData['points']]
 
-        filtered_data = quarterly_language_data[quarterly_language_data['quarter'].isin(selected_quarters)]
-
-        if filtered_data.empty:
-            updated_merged_df = merged_df.copy()
-            updated_merged_df['language'] = None # or set to other default value
-        else:
-
-            aggregated_filtered_df = filtered_data.groupby('parish_id').agg(
-                language=('language', mode)
-            ).reset_index()
-
-            updated_merged_df = gdf.merge(aggregated_filtered_df, left_on="id", right_on='parish_id', how='left')
-            updated_merged_df = merged_df[['id', 'name', 'geometry', 'parish_id']].merge(updated_merged_df[['parish_id','language']], on='parish_id', how='left')
-
-        fig_updated_map = px.choropleth_map(
-            updated_merged_df, 
-            geojson=updated_merged_df.geometry, 
-            locations=updated_merged_df.index,
-            color="language",
-            color_discrete_map=color_discrete_map,
-            center={"lat": 38.8, "lon": -9.1500},
-            hover_name="name",
-            zoom=10,
-            map_style="carto-positron",
-            hover_data=["language"],
-        )
-
-        fig_updated_map.update_layout(
-            margin={'r': 0, 'l': 0, 'b': 0, 't': 10},
-            paper_bgcolor="#fbfbfa"
-        )
-
-        return fig_updated_map
-    else:
-        # Return the original map if no selection has been made
-        return fig_map
+    # sum the selected quarter slices of the precomputed cube (all quarters
+    # when the selection is cleared); rows of merged_df and of the cube share
+    # the same parish order
+    languages = language_cube.modes(selected_quarters)['language']
+    return language_choropleth_patch(
+        merged_df['parish_id'], languages, merged_df['name'], language_cube.languages
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1 @@
+"""Timing scripts for the data pipeline, run with ``python -m benchmarks.<name>``."""
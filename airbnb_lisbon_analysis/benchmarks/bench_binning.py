@@ -0,0 +1,57 @@
+"""Server-side binning of synthetic listings at several map zooms.
+
+    python -m benchmarks.bench_binning --points 1000000 5000000
+
+For every size, mode and zoom this prints the binning time, the number of
+markers sent and the size of the resulting figure JSON. ``--raw`` also
+builds the unbinned figure for comparison (slow at millions of points).
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline.binning import binned_scatter_map, bin_points
+
+ZOOMS = [10, 12, 14]
+
+
+def synthetic_listings(n, seed=0):
+    """Listings scattered around Lisbon with a price and review language."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "latitude": rng.normal(38.72, 0.04, n),
+        "longitude": rng.normal(-9.15, 0.05, n),
+        "price": rng.gamma(2, 60, n).astype("float32"),
+        "language": rng.choice(["en", "pt", "fr", "de", "es"], n, p=[0.5, 0.2, 0.1, 0.1, 0.1]),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--raw", action="store_true", help="also time the unbinned figure")
+    args = parser.parse_args()
+
+    print(f"{'points':>10} {'mode':>7} {'color':>9} {'zoom':>5} {'bin ms':>9} {'markers':>8} {'json KB':>9}")
+    for n in args.points:
+        df = synthetic_listings(n)
+        for mode in ["hex", "square"]:
+            for color in ["price", "language"]:
+                for zoom in ZOOMS:
+                    start = time.perf_counter()
+                    binned, _ = bin_points(df, zoom, mode, color)
+                    elapsed = time.perf_counter() - start
+                    relayout = {"map.zoom": zoom}
+                    size = len(binned_scatter_map(df, relayout, mode, color, zoom).to_json()) / 1024
+                    print(f"{n:>10,} {mode:>7} {color:>9} {zoom:>5} {elapsed * 1000:>9.1f} {len(binned):>8,} {size:>9,.0f}")
+        if args.raw:
+            start = time.perf_counter()
+            size = len(binned_scatter_map(df, None, "points", "price", 12).to_json()) / 1024
+            elapsed = time.perf_counter() - start
+            print(f"{n:>10,} {'points':>7} {'price':>9} {'-':>5} {elapsed * 1000:>9.1f} {n:>8,} {size:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Startup, preprocessing and callback latency of a dashboard on synthetic data.
+
+    python -m benchmarks.bench_dashboard --scale 0.1 1 10 --repeat 50
+
+For every scale (1 is a Lisbon-sized snapshot, see ``benchmarks.synthetic``)
+a snapshot is generated into ``--work-dir`` (a temporary directory by
+default) and, from that directory:
+
+* every preprocessing stage runs twice, cold (no ``.cache``) and again with
+  its cache in place;
+* the dashboard script is executed, timing the import and the first render
+  of every tab, which builds the tab's data;
+* ``render_tab``, ``update_parish``, ``update_price_review`` and
+  ``update_price_trend`` are called directly ``--repeat`` times with random
+  inputs, with the figure cache emptied before each call, and again once
+  the cache holds every input.
+
+Latencies are reported as percentiles in milliseconds next to the process's
+peak resident memory so far; since that only grows, scales run smallest
+first. ``--output`` also writes the results as JSON, for comparing runs.
+"""
+import argparse
+import json
+import os
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pipeline.calendar_stats import load_calendar_stats
+from pipeline.data import CACHE_DIR, load_listings, load_review_languages, load_reviews
+from pipeline.figure_cache import ENV_VAR as FIGURE_CACHE_ENV_VAR
+from pipeline.languages import listing_languages
+from pipeline.parishes import load_listing_parishes
+from pipeline.price_series import load_price_series
+from pipeline.quarterly import QUARTERLY_FILE, build_parish_quarterly
+from pipeline.review_summary import load_review_quarters, load_review_summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = "combined_dashboard_final_stylised.py"
+PERCENTILES = [50, 95, 99]
+TABS = ["tab1", "tab2", "tab3"]
+RESOLUTIONS = ["day", "week", "month", "quarter"]
+
+
+def _write_quarterly():
+    build_parish_quarterly().to_csv(os.path.join("data", QUARTERLY_FILE), index=False)
+
+
+# in dependency order; all read the snapshot in ./data
+STAGES = {
+    "load_listings": load_listings,
+    "review_summary": lambda: (load_review_summary(), load_review_quarters()),
+    "calendar_stats": load_calendar_stats,
+    "listing_parishes": load_listing_parishes,
+    "listing_languages": lambda: listing_languages(load_reviews(columns=["id", "listing_id"]), load_review_languages()),
+    "parish_quarterly": _write_quarterly,
+    "price_series": load_price_series,
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 ** (2 if sys.platform == "darwin" else 1)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+class Report:
+    """Prints one row per measured step and keeps them for ``--output``."""
+
+    def __init__(self):
+        self.rows = []
+        print(f"{'scale':>6} {'step':<34} {'runs':>5} "
+              + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+              + f" {'max ms':>9} {'peak MB':>8}")
+
+    def add(self, scale, step, latencies):
+        latencies = np.asarray(latencies)
+        row = {
+            "scale": scale,
+            "step": step,
+            "runs": len(latencies),
+            **{f"p{p}_ms": float(np.percentile(latencies, p)) for p in PERCENTILES},
+            "max_ms": float(latencies.max()),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        self.rows.append(row)
+        print(f"{scale:>6g} {step:<34} {row['runs']:>5} "
+              + " ".join(f"{row[f'p{p}_ms']:>9.1f}" for p in PERCENTILES)
+              + f" {row['max_ms']:>9.1f} {row['peak_rss_mb']:>8.0f}")
+
+
+def bench_stages(report, scale):
+    shutil.rmtree(os.path.join("data", CACHE_DIR), ignore_errors=True)
+    for cache in ["cold", "cached"]:
+        for name, stage in STAGES.items():
+            report.add(scale, f"{name} ({cache})", [timed(stage)])
+
+
+def callback_inputs(dashboard, rng, repeat):
+    """Random inputs for every benchmarked callback the dashboard defines."""
+    inputs = {}
+    if "render_tab" in dashboard:
+        inputs["render_tab"] = [(tab,) for tab in rng.choice(TABS, repeat)]
+    if "update_parish" in dashboard:
+        quarters = list(dashboard["tabs"]["tab1"]["fig_bar"].data[0].x)
+        selections = []
+        for _ in range(repeat):
+            # a cleared selection now and then, otherwise a few quarters
+            if rng.random() < 0.1:
+                selections.append((None,))
+                continue
+            picked = rng.choice(quarters, rng.integers(1, min(8, len(quarters)) + 1), replace=False)
+            selections.append(({"points": [{"x": str(quarter)} for quarter in picked]},))
+        inputs["update_parish"] = selections
+    if "update_price_review" in dashboard:
+        max_reviews = dashboard["tabs"]["tab3"]["max_reviews"]
+        inputs["update_price_review"] = [(int(threshold),) for threshold in rng.integers(0, max_reviews + 1, repeat)]
+    if "update_price_trend" in dashboard:
+        inputs["update_price_trend"] = [(resolution,) for resolution in rng.choice(RESOLUTIONS, repeat)]
+    return inputs
+
+
+def bench_dashboard(report, scale, path, repeat, seed):
+    start = time.perf_counter()
+    dashboard = runpy.run_path(path, run_name="bench")
+    report.add(scale, "import", [(time.perf_counter() - start) * 1000])
+
+    figure_cache = dashboard.get("figure_cache")
+    if figure_cache is not None:
+        # this process only; a shared directory would hide the computation
+        figure_cache.directory = None
+
+    if "render_tab" in dashboard:
+        for tab in TABS:
+            report.add(scale, f"first render_tab({tab})", [timed(dashboard["render_tab"], tab)])
+
+    rng = np.random.default_rng(seed)
+    for name, calls in callback_inputs(dashboard, rng, repeat).items():
+        callback = dashboard[name]
+        latencies = []
+        for args in calls:
+            if figure_cache is not None:
+                figure_cache.clear()
+            latencies.append(timed(callback, *args))
+        report.add(scale, name, latencies)
+        if figure_cache is not None:
+            for args in calls:
+                callback(*args)
+            report.add(scale, f"{name} (cached)", [timed(callback, *args) for args in calls])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, nargs="+", default=[0.1, 1], help="sizes relative to Lisbon")
+    parser.add_argument("--repeat", type=int, default=50, help="calls per callback")
+    parser.add_argument("--dashboard", default=DASHBOARD, help="dashboard script, relative to the project")
+    parser.add_argument("--work-dir", default=None, help="where to generate the data (default: a temporary directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if os.environ.pop(FIGURE_CACHE_ENV_VAR, None):
+        print(f"ignoring {FIGURE_CACHE_ENV_VAR}; callbacks are timed against the in-process cache only")
+    path = os.path.join(ROOT, args.dashboard)
+    output = os.path.abspath(args.output) if args.output else None
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="airbnb-bench-")
+    cwd = os.getcwd()
+
+    report = Report()
+    try:
+        for scale in sorted(args.scale):
+            scale_dir = os.path.join(work_dir, f"scale-{scale:g}")
+            start = time.perf_counter()
+            # in a child process, so generating does not count towards the peak memory
+            subprocess.run([sys.executable, "-m", "benchmarks.synthetic", "--scale", str(scale),
+                            "--seed", str(args.seed), "--data-dir", os.path.join(scale_dir, "data")],
+                           cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+            print(f"# {scale:g}x Lisbon generated in {time.perf_counter() - start:.0f} s")
+
+            # the dashboards read ./data, so run from the directory holding it
+            os.chdir(scale_dir)
+            bench_stages(report, scale)
+            bench_dashboard(report, scale, path, args.repeat, args.seed)
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if output:
+        with open(output, "w") as fp:
+            json.dump({"dashboard": args.dashboard, "repeat": args.repeat, "results": report.rows}, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Throughput of price parsing over the full calendar.
+
+    python -m benchmarks.bench_prices --data-dir data
+
+Only the parsing is timed; reading the CSV chunks is excluded.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from pipeline.data import DATA_DIR, source_path
+from pipeline.prices import parse_price
+
+
+def legacy_parse(prices):
+    # what the dashboards used to do
+    return prices.str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(float)
+
+
+METHODS = {
+    "parse_price": parse_price,
+    "str.replace": legacy_parse,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    elapsed = dict.fromkeys(METHODS, 0.0)
+    rows = 0
+    reader = pd.read_csv(
+        source_path("calendar", args.data_dir),
+        compression="gzip",
+        usecols=["price"],
+        dtype={"price": "string"},
+        chunksize=args.chunksize,
+    )
+    for chunk in reader:
+        rows += len(chunk)
+        for name, method in METHODS.items():
+            start = time.perf_counter()
+            method(chunk["price"])
+            elapsed[name] += time.perf_counter() - start
+
+    print(f"{rows:,} calendar rows")
+    for name, seconds in elapsed.items():
+        print(f"{name:>12}: {seconds:7.2f}s  {rows / seconds:14,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
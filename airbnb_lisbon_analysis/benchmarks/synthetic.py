@@ -0,0 +1,176 @@
+"""Synthetic Inside Airbnb snapshots for benchmarking without the real data.
+
+    python -m benchmarks.synthetic --scale 1 --data-dir /tmp/bench/data
+
+Writes ``listings.csv.gz``, ``reviews.csv.gz``, ``calendar.csv.gz``,
+``review_languages.csv.gz`` and ``lisbon_parishes.geojson`` with the
+columns and formats of the real files. ``scale=1`` is roughly the size of
+the Lisbon snapshot; larger scales add copies of the city (each with its own
+parishes, shifted east) so listing density stays realistic. Files are
+written a batch of listings at a time as gzip members, so 100x fits in
+memory.
+"""
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data import DATA_DIR, DATASETS
+from pipeline.parishes import PARISHES_FILE
+
+# approximate size of one Lisbon snapshot
+LISBON = {"listings": 20_000, "reviews_per_listing": 50, "days": 365}
+# parishes of one city, as a grid of square cells over central Lisbon
+PARISH_GRID = (6, 4)
+PARISH_STEP = 0.03
+WEST, SOUTH = -9.25, 38.68
+# longitude offset between the copies of the city
+CITY_OFFSET = 1.0
+LANGUAGES = ["en", "pt", "fr", "de", "es", "it", "nl"]
+LANGUAGE_P = [0.45, 0.2, 0.12, 0.1, 0.07, 0.04, 0.02]
+COMMENTS = ["Great stay, thank you!", "Ótima estadia, obrigado.", "Très bien, merci beaucoup.",
+            "Sehr gut, danke.", "Muy buena ubicación.", None]
+BATCH_SIZE = 5_000
+
+
+def parish_features(city):
+    """GeoJSON features of the parish grid of the ``city``-th copy of Lisbon."""
+    columns, rows = PARISH_GRID
+    features = []
+    for i in range(columns):
+        for j in range(rows):
+            number = (city * columns + i) * rows + j + 1
+            x0, y0 = WEST + city * CITY_OFFSET + i * PARISH_STEP, SOUTH + j * PARISH_STEP
+            x1, y1 = x0 + PARISH_STEP, y0 + PARISH_STEP
+            features.append({
+                "type": "Feature",
+                "properties": {"id": 1000 + number, "name": f"Parish {number}"},
+                "geometry": {"type": "Polygon", "coordinates": [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]]},
+            })
+    return features
+
+
+def format_prices(values):
+    """Prices as the listings/calendar strings, e.g. ``"$1,250.00"``."""
+    strings = np.char.mod("$%.2f", values).astype(object)
+    # only the rare prices above 999 need a thousands separator
+    large = values >= 1000
+    strings[large] = [f"${value:,.2f}" for value in values[large]]
+    return strings
+
+
+def _append(df, path):
+    header = not os.path.exists(path)
+    df.to_csv(path, mode="a", header=header, index=False,
+              compression={"method": "gzip", "compresslevel": 1})
+
+
+def _listings(rng, ids, city):
+    n = len(ids)
+    columns, rows = PARISH_GRID
+    price = rng.gamma(2, 60, n).round()
+    return pd.DataFrame({
+        "id": ids,
+        "name": [f"Listing {i}" for i in ids],
+        "host_id": rng.integers(1, max(2, n // 3), n),
+        "host_since": "2018-05-01",
+        "latitude": rng.normal(SOUTH + rows * PARISH_STEP / 2, 0.025, n),
+        "longitude": rng.normal(WEST + city * CITY_OFFSET + columns * PARISH_STEP / 2, 0.035, n),
+        "room_type": rng.choice(["Entire home/apt", "Private room", "Hotel room", "Shared room"], n,
+                                p=[0.75, 0.22, 0.02, 0.01]),
+        "neighbourhood": "Lisboa, Portugal",
+        "neighbourhood_cleansed": rng.choice(["Misericórdia", "Santa Maria Maior", "Arroios", "Estrela"], n),
+        # a few listings have no price, as in the real snapshots
+        "price": np.where(rng.random(n) < 0.05, "", format_prices(price)),
+        "last_scraped": "2024-12-20",
+    }), price
+
+
+def _reviews(rng, ids, first_id):
+    # most listings have a handful of reviews, a few have hundreds
+    counts = rng.geometric(1 / (LISBON["reviews_per_listing"] + 1), len(ids)) - 1
+    listing_ids = np.repeat(ids, counts)
+    n = len(listing_ids)
+    dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D")
+    reviews = pd.DataFrame({
+        "listing_id": listing_ids,
+        "id": np.arange(first_id, first_id + n),
+        "date": dates.strftime("%Y-%m-%d"),
+        "reviewer_id": rng.integers(1, 10**7, n),
+        "reviewer_name": "Guest",
+        "comments": rng.choice(np.array(COMMENTS, dtype=object), n),
+    })
+    languages = pd.DataFrame({"id": reviews["id"], "language": rng.choice(LANGUAGES, n, p=LANGUAGE_P)})
+    return reviews, languages
+
+
+def _calendar(rng, ids, price):
+    days = pd.date_range("2024-12-21", periods=LISBON["days"])
+    n = len(ids) * len(days)
+    daily = (np.repeat(price, len(days)) * rng.uniform(0.8, 1.5, n)).round()
+    return pd.DataFrame({
+        "listing_id": np.repeat(ids, len(days)),
+        "date": np.tile(days.strftime("%Y-%m-%d"), len(ids)),
+        "available": rng.choice(np.array(["t", "f"], dtype=object), n),
+        "price": format_prices(daily),
+        "adjusted_price": "",
+        "minimum_nights": 2,
+        "maximum_nights": 365,
+    })
+
+
+def write_dataset(data_dir, scale=1.0, seed=0, log=print):
+    """Write a synthetic snapshot ``scale`` times the size of Lisbon to ``data_dir``.
+
+    Existing snapshot files in ``data_dir`` are replaced.
+
+    Returns:
+        dict: Number of rows written per dataset (and of parishes).
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n_listings = max(1, round(LISBON["listings"] * scale))
+    cities = max(1, math.ceil(scale))
+
+    features = [feature for city in range(cities) for feature in parish_features(city)]
+    with open(os.path.join(data_dir, PARISHES_FILE), "w") as fp:
+        json.dump({"type": "FeatureCollection", "features": features}, fp)
+
+    paths = {name: os.path.join(data_dir, DATASETS[name]["file"])
+             for name in ["listings", "reviews", "review_languages", "calendar"]}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+    rows = dict.fromkeys(paths, 0)
+    rows["parishes"] = len(features)
+    # listing ids are increasing but sparse, as in the real data
+    all_ids = np.cumsum(rng.integers(1, 40, n_listings))
+    for start in range(0, n_listings, BATCH_SIZE):
+        ids = all_ids[start:start + BATCH_SIZE]
+        city = start * cities // n_listings
+        listings, price = _listings(rng, ids, city)
+        reviews, languages = _reviews(rng, ids, 10**6 + rows["reviews"])
+        for name, df in [("listings", listings), ("reviews", reviews), ("review_languages", languages),
+                         ("calendar", _calendar(rng, ids, price))]:
+            _append(df, paths[name])
+            rows[name] += len(df)
+        log(f"{rows['listings']:,} of {n_listings:,} listings written")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--scale", type=float, default=1.0, help="size relative to Lisbon (default: 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = write_dataset(args.data_dir, args.scale, args.seed)
+    print(", ".join(f"{count:,} {name}" for name, count in rows.items()))
+
+
+if __name__ == "__main__":
+    main()
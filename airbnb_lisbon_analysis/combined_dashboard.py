@@ -3,6 +3,11 @@ import geopandas as gpd
 import plotly.express as px
 from dash import Dash, dcc, html, Input, Output
 
+from pipeline.data import load_listings
+from pipeline.geometry import ParishGeometry
+from pipeline.reducers import mode_by
+from pipeline.review_summary import load_review_summary
+
 COLORS = {
     'background': '#f8f9fa',
     'text': '#2c3e50',
@@ -20,16 +25,13 @@ gdf = gpd.read_file("./data/lisbon_parishes.geojson")
 quarterly_language_data = pd.read_csv("data/parish_data_quarterly.csv")
 
 
-def mode(x):
-    return x.mode()[0] if not x.empty else None
-
-
 aggregated_df = quarterly_language_data.groupby('parish_id').agg(
-    total_reviews=('num_reviews', 'sum'),
-    language=('language', mode)
-).reset_index()
+    total_reviews=('num_reviews', 'sum')
+).join(mode_by(quarterly_language_data, 'parish_id')).reset_index()
 
 merged_df = gdf.merge(aggregated_df, left_on="id", right_on='parish_id')
+# polygons are served once from their own URL instead of inside every figure
+parish_geojson_url = ParishGeometry(gdf).serve(app)
 unique_languages = merged_df['language'].unique().tolist()
 color_discrete_map = {
     lang: px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
@@ -38,8 +40,9 @@ color_discrete_map = {
 
 fig_map = px.choropleth_map(
     merged_df,
-    geojson=merged_df.geometry,
-    locations=merged_df.index,
+    geojson=parish_geojson_url,
+    locations='parish_id',
+    featureidkey='id',
     color="language",
     color_discrete_map=color_discrete_map,
     center={"lat": 38.8, "lon": -9.1500},
@@ -71,9 +74,8 @@ fig_bar.update_layout(
 
 
 # --- Dashboard 2: Price Map ---
-listings_df = pd.read_csv('data/listings.csv.gz', compression='gzip')
-listings_df['price'] = listings_df['price'].str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(
-    float)
+listings = load_listings()
+listings_df = listings.copy()
 listings_df = listings_df.dropna(subset=['latitude', 'longitude', 'price'])
 
 fig_price = px.scatter_map(
@@ -96,15 +98,13 @@ fig_price.update_layout(
 )
 
 # --- Dashboard 3: Price vs Reviews Map com Slider ---
-reviews = pd.read_csv("data/reviews.csv.gz", compression="gzip")
-
-listings_detailed = pd.read_csv("data/listings.csv.gz", compression="gzip")
-listings_detailed['price'] = listings_detailed['price'].str.replace('$', '').str.replace(',', '').astype(float)
+listings_detailed = listings.copy()
 avg_price = listings_detailed.groupby('id')['price'].mean().reset_index()
 avg_price.rename(columns={'id': 'listing_id', 'price': 'avg_price'}, inplace=True)
 
-review_counts = reviews['listing_id'].value_counts().reset_index()
-review_counts.columns = ['listing_id', 'review_count']
+# per-listing review counts precomputed from reviews.csv.gz; the reviews
+# themselves are never loaded by the dashboard
+review_counts = load_review_summary(columns=['listing_id', 'review_count'])
 
 merged_data = pd.merge(listings_detailed, avg_price, left_on='id', right_on='listing_id', how='left')
 merged_data = pd.merge(merged_data, review_counts, left_on='id', right_on='listing_id', how='left')
@@ -205,7 +205,7 @@ def update_map(review_threshold):
     )
 
     fig.update_layout(
-        mapbox_bounds={
+        map_bounds={
             "west": filtered_data['longitude'].min() - 0.05,
             "east": filtered_data['longitude'].max() + 0.05,
             "south": filtered_data['latitude'].min() - 0.05,
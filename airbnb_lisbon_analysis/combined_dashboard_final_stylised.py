@@ -3,6 +3,19 @@ import geopandas as gpd
 import plotly.express as px
 from dash import Dash, dcc, html, Input, Output
 
+from pipeline.binning import BIN_MODES, binned_scatter_map
+from pipeline.data import CACHE_VERSION, DATASETS, load_listings, sources_digest
+from pipeline.figure_cache import FigureCache
+from pipeline.geometry import ParishGeometry
+from pipeline.language_cube import LanguageCube
+from pipeline.lazy import LazyRegistry, warm_up_enabled
+from pipeline.map_figures import language_choropleth, language_choropleth_patch, scatter_map_patch
+from pipeline.price_series import load_price_series
+from pipeline.reducers import mode_by
+from pipeline.review_summary import load_review_summary
+from pipeline.shared import shared_frame
+from pipeline.thresholds import ThresholdIndex
+
 COLORS = {
     'background': '#fefcf9',
     'text': '#657b83',
@@ -17,22 +30,24 @@ app = Dash(__name__, external_stylesheets=[
     "https://fonts.googleapis.com/css2?family=Poppins:wght@400;600&display=swap",
 ], suppress_callback_exceptions=True)
 
-# --- Dashboard 1: Nationality & Parish ---
-gdf = gpd.read_file("./data/lisbon_parishes.geojson")
-quarterly_language_data = pd.read_csv("data/parish_data_quarterly.csv")
-
+# Every tab's data and figures are built the first time the tab is rendered
+# (or by the background warm-up), not at import, so the server answers
+# straight away after a deploy.
+tabs = LazyRegistry()
 
-def mode(x):
-    return x.mode()[0] if not x.empty else None
+# bump whenever a cached callback returns something different for the same
+# inputs, so figures pickled under AIRBNB_FIGURE_CACHE_DIR by an earlier
+# deploy are not served by the new code
+FIGURES_VERSION = 1
 
+# Callback outputs depend only on their inputs, the data files and the
+# version of the callbacks, so they are shared across users (and, with
+# AIRBNB_FIGURE_CACHE_DIR set, across workers)
+figure_cache = FigureCache(version=lambda: f'v{CACHE_VERSION}.{FIGURES_VERSION}-' + sources_digest([
+    DATASETS['listings']['file'], DATASETS['reviews']['file'], DATASETS['calendar']['file'],
+    'parish_data_quarterly.csv', 'lisbon_parishes.geojson'
+]))
 
-aggregated_df = quarterly_language_data.groupby('parish_id').agg(
-    total_reviews=('num_reviews', 'sum'),
-    language=('language', mode)
-).reset_index()
-
-merged_df = gdf.merge(aggregated_df, left_on="id", right_on='parish_id')
-unique_languages = merged_df['language'].unique().tolist()
 pastel_colors = ['#f6c5af', '#b5d4e5', '#f2e1c2', '#c1d9ce', '#e5c7d3']
 
 language_color_map = {
@@ -46,86 +61,222 @@ language_color_map = {
 color_discrete_map = language_color_map
 
 
-fig_map = px.choropleth_map(
-    merged_df,
-    geojson=merged_df.geometry,
-    locations=merged_df.index,
-    color="language",
-    color_discrete_map=color_discrete_map,
-    center={"lat": 38.8, "lon": -9.1500},
-    hover_name="name",
-    zoom=10,
-    map_style="carto-positron",
-    hover_data=["language"]
-)
-fig_map.update_layout(
-    margin={'r': 0, 'l': 0, 'b': 0, 't': 10},
-    paper_bgcolor=COLORS['background'],
-    plot_bgcolor=COLORS['background'],
-    font={'family': 'Roboto'},
-    hoverlabel={'font_size': 14, 'font_family': 'Roboto'}
-)
+# --- Dashboard 1: Nationality & Parish ---
+@tabs.register('parishes')
+def load_parishes():
+    return gpd.read_file("./data/lisbon_parishes.geojson")
+
+
+# polygons are served once from their own URL instead of inside every figure;
+# the route is registered now and reads the file on its first request
+parish_geojson_url = ParishGeometry(lambda: tabs['parishes']).serve(app)
+
+
+@tabs.register('tab1')
+def build_tab1():
+    gdf = tabs['parishes']
+    quarterly_language_data = pd.read_csv("data/parish_data_quarterly.csv")
+
+    aggregated_df = quarterly_language_data.groupby('parish_id').agg(
+        total_reviews=('num_reviews', 'sum')
+    ).join(mode_by(quarterly_language_data, 'parish_id')).reset_index()
+
+    merged_df = gdf.merge(aggregated_df, left_on="id", right_on='parish_id')
+    language_cube = LanguageCube(quarterly_language_data, parish_ids=merged_df['parish_id'])
+
+    fig_map = language_choropleth(
+        parish_geojson_url,
+        merged_df['parish_id'],
+        merged_df['language'],
+        merged_df['name'],
+        language_cube.languages,
+        color_discrete_map,
+        center={"lat": 38.8, "lon": -9.1500},
+        zoom=10,
+        style="carto-positron"
+    )
+    fig_map.update_layout(
+        margin={'r': 0, 'l': 0, 'b': 0, 't': 10},
+        paper_bgcolor=COLORS['background'],
+        plot_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        hoverlabel={'font_size': 14, 'font_family': 'Roboto'}
+    )
 
 
-quarterly_reviews = quarterly_language_data.groupby('quarter')['num_reviews'].sum().reset_index()
-fig_bar = px.bar(
-    quarterly_reviews,
-    x='quarter',
-    y='num_reviews',
-    color_discrete_sequence=['#f6c5af']  
-)
+    quarterly_reviews = quarterly_language_data.groupby('quarter')['num_reviews'].sum().reset_index()
+    fig_bar = px.bar(
+        quarterly_reviews,
+        x='quarter',
+        y='num_reviews',
+        color_discrete_sequence=['#f6c5af']  
+    )
 
-fig_bar.update_layout(
-    margin={'r': 20, 'l': 20, 'b': 20, 't': 30},
-    paper_bgcolor=COLORS['background'],
-    plot_bgcolor=COLORS['background'],
-    font={'family': 'Roboto'},
-    hoverlabel={'font_size': 14, 'font_family': 'Roboto'},
-    xaxis={'gridcolor': '#eee'},
-    yaxis={'gridcolor': '#eee'}
-)
+    fig_bar.update_layout(
+        margin={'r': 20, 'l': 20, 'b': 20, 't': 30},
+        paper_bgcolor=COLORS['background'],
+        plot_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        hoverlabel={'font_size': 14, 'font_family': 'Roboto'},
+        xaxis={'gridcolor': '#eee'},
+        yaxis={'gridcolor': '#eee'}
+    )
+    return {'merged_df': merged_df, 'language_cube': language_cube, 'fig_map': fig_map, 'fig_bar': fig_bar}
 
 
 # --- Dashboard 2: Price Map ---
-listings_df = pd.read_csv('data/listings.csv.gz', compression='gzip')
-listings_df['price'] = listings_df['price'].str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(
-    float)
-listings_df = listings_df.dropna(subset=['latitude', 'longitude', 'price'])
-
-fig_price = px.scatter_map(
-    listings_df,
-    lat='latitude',
-    lon='longitude',
-    color='price',
-    color_continuous_scale=['#f6c5af', '#b5d4e5', '#f2e1c2', '#c1d9ce', '#e5c7d3'],
-    size_max=15,
-    zoom=12,
-    title='Airbnb Listings in Lisbon - Price Distribution',
-    hover_name='name',
-    hover_data=['room_type', 'neighbourhood'],
-    map_style="carto-positron"
-)
-fig_price.update_layout(
-    margin={'r': 0, 't': 40, 'l': 0, 'b': 0},
-    paper_bgcolor=COLORS['background'],
-    font={'family': 'Roboto'},
-    title=None
-)
+# listings are shared by tabs 2 and 3 and loaded once for both
+@tabs.register('listings')
+def load_listings_once():
+    return load_listings()
+
+
+PRICE_MAP_COLUMNS = ['latitude', 'longitude', 'price', 'name', 'room_type', 'neighbourhood']
+
+
+# Listings are binned server-side (hexagons by default) with the bin size
+# following the map zoom; the tab's radio items switch back to raw points
+def price_map_figure(listings_df, relayoutData, bin_mode):
+    fig = binned_scatter_map(
+        listings_df,
+        relayoutData,
+        bin_mode,
+        color='price',
+        default_zoom=12,
+        color_continuous_scale=['#f6c5af', '#b5d4e5', '#f2e1c2', '#c1d9ce', '#e5c7d3'],
+        size_max=15,
+        title='Airbnb Listings in Lisbon - Price Distribution',
+        hover_name='name',
+        hover_data=['room_type', 'neighbourhood'],
+        map_style="carto-positron"
+    )
+    fig.update_layout(
+        margin={'r': 0, 't': 40, 'l': 0, 'b': 0},
+        paper_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        title=None
+    )
+    return fig
+
+
+@tabs.register('tab2')
+def build_tab2():
+    # one read-only copy for all workers when AIRBNB_SHARED_DATA is set
+    listings_df = shared_frame(
+        'price_map_listings',
+        [DATASETS['listings']['file']],
+        lambda: tabs['listings'].dropna(subset=['latitude', 'longitude', 'price'])[PRICE_MAP_COLUMNS]
+    )
+    return {'listings_df': listings_df, 'fig_price': price_map_figure(listings_df, None, 'hex')}
+
+
+# Price trends come from the precomputed price series table (see
+# pipeline.price_series), so the chart never scans the calendar
+TREND_RESOLUTIONS = [
+    {'label': 'Daily', 'value': 'day'},
+    {'label': 'Weekly', 'value': 'week'},
+    {'label': 'Monthly', 'value': 'month'},
+    {'label': 'Quarterly', 'value': 'quarter'},
+]
+
+
+@tabs.register('price_series')
+def load_price_trends():
+    series = load_price_series()
+    return series[series['level'] != 'parish']
+
+
+@figure_cache.memoize
+def price_trend_figure(resolution):
+    series = tabs['price_series']
+    series = series[series['resolution'] == resolution]
+    city = series[series['level'] == 'city']
+
+    fig = px.line(
+        series[series['level'] == 'room_type'],
+        x='date',
+        y='avg_price',
+        color='key',
+        color_discrete_sequence=pastel_colors,
+        labels={'date': 'Date', 'avg_price': 'Average Price', 'key': 'Room type'}
+    )
+    # the middle half of the city's prices as a band around its average
+    fig.add_scatter(x=city['date'], y=city['p75'], mode='lines', line={'width': 0},
+                    showlegend=False, hoverinfo='skip')
+    fig.add_scatter(x=city['date'], y=city['p25'], mode='lines', line={'width': 0}, fill='tonexty',
+                    fillcolor='rgba(181, 137, 0, 0.15)', name='City 25th-75th percentile')
+    fig.add_scatter(x=city['date'], y=city['avg_price'], mode='lines',
+                    line={'color': COLORS['primary'], 'width': 3}, name='City average')
+    fig.update_layout(
+        margin={'r': 20, 'l': 20, 'b': 20, 't': 30},
+        paper_bgcolor=COLORS['background'],
+        plot_bgcolor=COLORS['background'],
+        font={'family': 'Roboto'},
+        hoverlabel={'font_size': 14, 'font_family': 'Roboto'},
+        xaxis={'gridcolor': '#eee'},
+        yaxis={'gridcolor': '#eee'}
+    )
+    return fig
+
 
 # --- Dashboard 3: Price vs Reviews Map com Slider ---
-reviews = pd.read_csv("data/reviews.csv.gz", compression="gzip")
+PRICE_REVIEW_COLUMNS = ['latitude', 'longitude', 'avg_price', 'review_count', 'name']
+
+
+def price_review_data():
+    listings_detailed = tabs['listings']
+    avg_price = listings_detailed.groupby('id')['price'].mean().reset_index()
+    avg_price.rename(columns={'id': 'listing_id', 'price': 'avg_price'}, inplace=True)
+
+    # per-listing review counts precomputed from reviews.csv.gz; the reviews
+    # themselves are never loaded by the dashboard
+    review_counts = load_review_summary(columns=['listing_id', 'review_count'])
+
+    merged_data = pd.merge(listings_detailed, avg_price, left_on='id', right_on='listing_id', how='left')
+    merged_data = pd.merge(merged_data, review_counts, left_on='id', right_on='listing_id', how='left')
+    merged_data['review_count'] = merged_data['review_count'].fillna(0)
+    # sorted by review_count up front, so ThresholdIndex can use the (possibly
+    # shared, read-only) frame without reordering it
+    return merged_data[PRICE_REVIEW_COLUMNS].sort_values('review_count', kind='stable')
+
+
+@tabs.register('tab3')
+def build_tab3():
+    # one read-only copy for all workers when AIRBNB_SHARED_DATA is set
+    merged_data = shared_frame(
+        'price_review_listings',
+        [DATASETS['listings']['file'], DATASETS['reviews']['file']],
+        price_review_data
+    )
 
-listings_detailed = pd.read_csv("data/listings.csv.gz", compression="gzip")
-listings_detailed['price'] = listings_detailed['price'].str.replace('$', '').str.replace(',', '').astype(float)
-avg_price = listings_detailed.groupby('id')['price'].mean().reset_index()
-avg_price.rename(columns={'id': 'listing_id', 'price': 'avg_price'}, inplace=True)
+    # sorted by review_count, so a slider threshold is a binary search and the
+    # bounds of the remaining listings come from precomputed suffix min/max
+    review_index = ThresholdIndex(merged_data, 'review_count')
 
-review_counts = reviews['listing_id'].value_counts().reset_index()
-review_counts.columns = ['listing_id', 'review_count']
 
-merged_data = pd.merge(listings_detailed, avg_price, left_on='id', right_on='listing_id', how='left')
-merged_data = pd.merge(merged_data, review_counts, left_on='id', right_on='listing_id', how='left')
-merged_data['review_count'] = merged_data['review_count'].fillna(0)
+    # Base figure for tab 3 at threshold 0; slider moves patch its points
+    fig_price_review = px.scatter_map(
+        merged_data,
+        lat="latitude",
+        lon="longitude",
+        color="avg_price",
+        size="review_count",
+        hover_name="name",
+        hover_data=["avg_price", "review_count"],
+        color_continuous_scale=px.colors.sequential.Plasma,
+        zoom=11,
+        title="AirBnB Listings in Lisbon (Price vs. Reviews)",
+        map_style="carto-positron",
+    )
+    fig_price_review.update_layout(
+        map_bounds=review_index.bounds(0, margin=0.05),
+        margin={"r": 0, "t": 40, "l": 0, "b": 0}
+    )
+    return {
+        'max_reviews': int(merged_data['review_count'].max()),
+        'review_index': review_index,
+        'fig_price_review': fig_price_review,
+    }
 
 # --- Layout com abas ---
 app.layout = html.Div([
@@ -236,6 +387,7 @@ app.layout = html.Div([
     Output('tabs-content', 'children'),
     Input('tabs', 'value')
 )
+@figure_cache.memoize
 def render_tab(tab):
     title_style = {
         'font-family': 'Poppins',
@@ -246,20 +398,29 @@ def render_tab(tab):
     }
 
     if tab == 'tab1':
+        data = tabs['tab1']
         return html.Div([
             html.P("By nationality and parish (Region of Lisbon)", style=title_style),
-            dcc.Graph(id='map-graph', figure=fig_map, style={'height': '60vh'}),
-            dcc.Graph(id='bar-graph', figure=fig_bar, style={'height': '35vh'})
+            dcc.Graph(id='map-graph', figure=data['fig_map'], style={'height': '60vh'}),
+            dcc.Graph(id='bar-graph', figure=data['fig_bar'], style={'height': '35vh'})
         ])
     elif tab == 'tab2':
+        data = tabs['tab2']
         return html.Div([
             html.P("Airbnb Price Distribution", style=title_style),
-            dcc.Graph(figure=fig_price)
+            dcc.RadioItems(id='price-bin-mode', options=BIN_MODES, value='hex', inline=True,
+                           inputStyle={'margin-right': '5px', 'margin-left': '15px'}),
+            dcc.Graph(id='price-map', figure=data['fig_price']),
+            html.P("Price Trends", style=title_style),
+            dcc.RadioItems(id='price-trend-resolution', options=TREND_RESOLUTIONS, value='week', inline=True,
+                           inputStyle={'margin-right': '5px', 'margin-left': '15px'}),
+            dcc.Graph(id='price-trend', style={'height': '35vh'})
         ])
     elif tab == 'tab3':
+        data = tabs['tab3']
         return html.Div([
             html.P("Airbnb Listings (Filtered by Review Count)", style=title_style),
-            dcc.Graph(id='airbnb-map'),
+            dcc.Graph(id='airbnb-map', figure=data['fig_price_review']),
             html.Div([
                 html.Label("Review Count Threshold:",
                            style={
@@ -271,72 +432,83 @@ def render_tab(tab):
                 dcc.Slider(
                     id='review-slider',
                     min=0,
-                    max=int(merged_data['review_count'].max()),
+                    max=data['max_reviews'],
                     value=0,
                     step=1,
                     marks={i: str(i) for i in range(
-                        0, int(merged_data['review_count'].max()) + 1,
-                        max(1, int(merged_data['review_count'].max() / 10))
+                        0, data['max_reviews'] + 1,
+                        max(1, int(data['max_reviews'] / 10))
                     )}
                 ),
             ], style={'width': '80%', 'margin': 'auto'})
         ])
 
+# The callbacks below send Patch diffs: the figures already on the page keep
+# their layout and only the changed trace arrays are replaced.
 @app.callback(
     Output('map-graph', 'figure'),
-    Input('bar-graph', 'selectedData')
+    Input('bar-graph', 'selectedData'),
+    prevent_initial_call=True
 )
 def update_parish(selectedData):
+    selected_quarters = None
     if selectedData and selectedData['points']:
-        selected_quarters = [point['x'] for point in selectedData['points']]
-
-        filtered_data = quarterly_language_data[quarterly_language_data['quarter'].isin(selected_quarters)]
-
-        if filtered_data.empty:
-            updated_merged_df = merged_df.copy()
-            updated_merged_df['language'] = None # or set to other default value
-        else:
-
-            aggregated_filtered_df = filtered_data.groupby('parish_id').agg(
-                language=('language', mode)
-            ).reset_index()
-
-            updated_merged_df = gdf.merge(aggregated_filtered_df, left_on="id", right_on='parish_id', how='left')
-            updated_merged_df = merged_df[['id', 'name', 'geometry', 'parish_id']].merge(updated_merged_df[['parish_id','language']], on='parish_id', how='left')
-
-        fig_updated_map = px.choropleth_map(
-            updated_merged_df,
-            geojson=updated_merged_df.geometry,
-            locations=updated_merged_df.index,
-            color="language",
-            color_discrete_map=color_discrete_map,
-            center={"lat": 38.8, "lon": -9.1500},
-            hover_name="name",
-            zoom=10,
-            map_style="carto-positron",
-            hover_data=["language"],
-        )
-
-        fig_updated_map.update_layout(
-            margin={'r': 0, 'l': 0, 'b': 0, 't': 10},
-            paper_bgcolor="#fbfbfa"
-        )
-
-        return fig_updated_map
-    else:
-        # Return the original map if no selection has been made
-        return fig_map
+        # the same quarters selected in any order give the same patch
+        selected_quarters = tuple(sorted({point['x'] for point in selectedData['points']}))
+    return parish_patch(selected_quarters)
+
+
+@figure_cache.memoize
+def parish_patch(selected_quarters):
+    # sum the selected quarter slices of the precomputed cube (all quarters
+    # when the selection is cleared); rows of merged_df and of the cube share
+    # the same parish order
+    data = tabs['tab1']
+    merged_df, language_cube = data['merged_df'], data['language_cube']
+    languages = language_cube.modes(None if selected_quarters is None else list(selected_quarters))['language']
+    return language_choropleth_patch(
+        merged_df['parish_id'], languages, merged_df['name'], language_cube.languages
+    )
+
+
+# --- Callback da aba 2 ---
+@app.callback(
+    Output('price-map', 'figure'),
+    Input('price-map', 'relayoutData'),
+    Input('price-bin-mode', 'value'),
+    prevent_initial_call=True
+)
+def update_price_map(relayoutData, bin_mode):
+    return price_map_figure(tabs['tab2']['listings_df'], relayoutData, bin_mode)
+
+
+# filled after the tab renders, so the map does not wait for the trend data
+@app.callback(
+    Output('price-trend', 'figure'),
+    Input('price-trend-resolution', 'value')
+)
+def update_price_trend(resolution):
+    return price_trend_figure(resolution)
 
 
 # --- Callback da aba 3 ---
 @app.callback(
     Output('airbnb-map', 'figure'),
-    Input('review-slider', 'value')
+    Input('review-slider', 'value'),
+    prevent_initial_call=True
 )
 def update_price_review(review_threshold):
-    filtered_data = merged_data[merged_data['review_count'] >= review_threshold]
+    return price_review_patch(review_threshold)
+
 
-    fig = px.scatter_map(
+# the patch only depends on the threshold, so repeated slider positions are
+# served from the cache
+@figure_cache.memoize
+def price_review_patch(review_threshold):
+    review_index = tabs['tab3']['review_index']
+    filtered_data = review_index.at_least(review_threshold)
+
+    patch = scatter_map_patch(
         filtered_data,
         lat="latitude",
         lon="longitude",
@@ -344,23 +516,21 @@ def update_price_review(review_threshold):
         size="review_count",
         hover_name="name",
         hover_data=["avg_price", "review_count"],
-        color_continuous_scale=px.colors.sequential.Plasma,
-        zoom=11,
-        title="AirBnB Listings in Lisbon (Price vs. Reviews)",
-        map_style="carto-positron",
+        bounds=review_index.bounds(review_threshold, margin=0.05)
     )
+    return patch
 
-    fig.update_layout(
-        mapbox_bounds={
-            "west": filtered_data['longitude'].min()-0.05,
-            "east": filtered_data['longitude'].max()+0.05,
-            "south": filtered_data['latitude'].min()-0.05,
-            "north": filtered_data['latitude'].max()+0.05
-        },
-        margin={"r": 0, "t": 40, "l": 0, "b": 0}
-    )
-    return fig
+
+# WSGI entry point, e.g. ``gunicorn combined_dashboard_final_stylised:server``; with
+# AIRBNB_WARM_UP=1 every worker builds the tabs in the background from its
+# first request on
+server = app.server
+if warm_up_enabled():
+    tabs.warm_on_first_request(server)
 
 
 if __name__ == '__main__':
+    # warm up once the server answers its first request, in the serving
+    # process only (not in the debug reloader's file watcher)
+    tabs.warm_on_first_request(server)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,2 @@
+# the pipeline package lives next to this file; pytest puts this directory on
+# sys.path because of it, so the tests run from the repository root as well
@@ -1,21 +1,20 @@
 import pandas as pd
-import plotly.express as px
 import dash
 from dash import dcc, html
+from dash.dependencies import Input, Output
 
-# Load the datasets
-listings = pd.read_csv('data/listings.csv.gz', compression='gzip')
-reviews = pd.read_csv('data/reviews.csv.gz', compression='gzip')
-review_languages = pd.read_csv('data/review_languages.csv.gz', compression='gzip')
-
-# Merge reviews and review_languages to get language for each review
-merged_reviews = pd.merge(reviews, review_languages, on='id', how='left')
+from pipeline.binning import BIN_MODES, binned_scatter_map
+from pipeline.data import load_listings, load_reviews, load_review_languages
+from pipeline.languages import listing_languages
 
-# Group by listing_id and language, count the number of reviews
-language_counts = merged_reviews.groupby(['listing_id', 'language']).size().reset_index(name='count')
+# Load the datasets
+listings = load_listings()
+reviews = load_reviews(columns=['id', 'listing_id'])
+review_languages = load_review_languages()
 
-# Find the most frequent language for each listing
-most_frequent_languages = language_counts.sort_values(by='count', ascending=False).groupby('listing_id').first().reset_index()
+# Most frequent review language per listing and its number of reviews
+listing_summary, _ = listing_languages(reviews, review_languages)
+most_frequent_languages = listing_summary[['language', 'count']].reset_index()
 
 # Merge with listings to get latitude and longitude
 listings_with_languages = pd.merge(listings, most_frequent_languages, left_on='id', right_on='listing_id', how='left')
@@ -24,30 +23,39 @@ listings_with_languages = pd.merge(listings, most_frequent_languages, left_on='i
 listings_with_languages['language'] = listings_with_languages['language'].fillna('Unknown')
 listings_with_languages = listings_with_languages.dropna(subset=['count'])
 
-# Create the map using Plotly Express
-fig = px.scatter_map(
-    listings_with_languages,
-    lat='latitude',
-    lon='longitude',
-    color='language',
-    size='count',
-    hover_name='name',
-    hover_data=['room_type', 'price', 'count'],
-    zoom=11,
-    title='Airbnb Listings in Lisbon by Most Frequent Review Language'
-)
-
-fig.update_layout(
-    margin={'r': 0, 't': 40, 'l': 0, 'b': 0}
-)
-
 # Create a Dash app
 app = dash.Dash(__name__)
 
 app.layout = html.Div(children=[
     html.H1(children='Airbnb Listings in Lisbon'),
-    dcc.Graph(id='airbnb-map', figure=fig)
+    dcc.RadioItems(id='bin-mode', options=BIN_MODES, value='hex', inline=True),
+    dcc.Graph(id='airbnb-map')
 ])
 
+
+# Create the map using Plotly Express; binned cells show their dominant language
+@app.callback(
+    Output('airbnb-map', 'figure'),
+    Input('airbnb-map', 'relayoutData'),
+    Input('bin-mode', 'value')
+)
+def update_map(relayoutData, bin_mode):
+    fig = binned_scatter_map(
+        listings_with_languages,
+        relayoutData,
+        bin_mode,
+        color='language',
+        default_zoom=11,
+        size='count',
+        hover_name='name',
+        hover_data=['room_type', 'price', 'count'],
+        title='Airbnb Listings in Lisbon by Most Frequent Review Language'
+    )
+
+    fig.update_layout(
+        margin={'r': 0, 't': 40, 'l': 0, 'b': 0}
+    )
+    return fig
+
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
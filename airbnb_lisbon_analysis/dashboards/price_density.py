@@ -1,45 +1,58 @@
-import pandas as pd
-import plotly.express as px
 import dash
 from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from pipeline.binning import BIN_MODES, binned_scatter_map
+from pipeline.data import load_listings
 
 # 1. Load the data
-listings_df = pd.read_csv('data/listings.csv.gz', compression='gzip')  # Use the summary listings for simplicity
+listings_df = load_listings()  # Use the summary listings for simplicity
 
 # 2. Clean and prepare the data
-# Handle missing prices and convert to numeric
-listings_df['price'] = listings_df['price'].str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(float)
+# Handle missing prices (prices are already numeric when loaded)
 listings_df = listings_df.dropna(subset=['latitude', 'longitude', 'price'])
 
-# 3. Create the scatter map using Plotly Express
-fig = px.scatter_map(
-    listings_df,
-    lat='latitude',
-    lon='longitude',
-    color='price',
-    size_max=15,  # Adjust size as needed
-    zoom=12,  # Adjust zoom level for Lisbon
-    title='Airbnb Listings in Lisbon - Price Distribution',
-    hover_name='name',  # Display listing name on hover
-    hover_data=['room_type', 'neighbourhood'] #Display room type and neighborhood on hover
-)
-
-fig.update_layout(
-    margin={'r': 0, 't': 40, 'l': 0, 'b': 0}
-)
-
-# 4. Create the Dash app
+# 3. Create the Dash app
 app = dash.Dash(__name__)
 
 app.layout = html.Div(children=[
     html.H1(children='Airbnb Listings in Lisbon'),
 
-    dcc.Graph(
-        id='airbnb-map',
-        figure=fig
-    )
+    dcc.RadioItems(
+        id='bin-mode',
+        options=BIN_MODES,
+        value='hex',
+        inline=True
+    ),
+    dcc.Graph(id='airbnb-map')
 ])
 
+
+# 4. Create the scatter map, binned server-side unless zoomed in far enough
+@app.callback(
+    Output('airbnb-map', 'figure'),
+    Input('airbnb-map', 'relayoutData'),
+    Input('bin-mode', 'value')
+)
+def update_map(relayoutData, bin_mode):
+    fig = binned_scatter_map(
+        listings_df,
+        relayoutData,
+        bin_mode,
+        color='price',
+        default_zoom=12,  # Adjust zoom level for Lisbon
+        size_max=15,  # Adjust size as needed
+        title='Airbnb Listings in Lisbon - Price Distribution',
+        hover_name='name',  # Display listing name on hover
+        hover_data=['room_type', 'neighbourhood'] #Display room type and neighborhood on hover
+    )
+
+    fig.update_layout(
+        margin={'r': 0, 't': 40, 'l': 0, 'b': 0}
+    )
+    return fig
+
+
 # 5. Run the app
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,57 +1,103 @@
+import functools
+
 import pandas as pd
 import plotly.express as px
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash import dcc, html, no_update
+from dash.dependencies import Input, Output, State
 import gzip
 import io
 import numpy as np
 
-listings = pd.read_csv('data/listings.csv.gz', compression='gzip')
-calendar = pd.read_csv('data/calendar.csv.gz', compression='gzip')
+from pipeline.binning import BIN_MODES, POINTS_ZOOM, binned_scatter_map, zoom_from_relayout
+from pipeline.calendar_stats import load_calendar_stats
+from pipeline.data import load_listings
+from pipeline.viewport import GridIndex, contains, pad_viewport, viewport_from_relayout
 
-# Data Preprocessing
-# Convert price to numeric
-calendar['price'] = calendar['price'].str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(float)
+DEFAULT_ZOOM = 11
 
-# Calculate price standard deviation per listing
-price_std = calendar.groupby('listing_id')['price'].std().reset_index()
-price_std.rename(columns={'price': 'price_std'}, inplace=True)
+listings = load_listings()
+
+# Data Preprocessing
+# Price standard deviation per listing, streamed over the calendar once and
+# cached until calendar.csv.gz changes
+price_std = load_calendar_stats().price_std[['listing_id', 'price_std']]
 
 # Merge with listings data
 listings = pd.merge(listings, price_std, left_on='id', right_on='listing_id', how='left')
 
 # Drop NaN price_std values, if any.
-listings = listings.dropna(subset=['price_std'])
+listings = listings.dropna(subset=['price_std']).reset_index(drop=True)
+
+# Grid over the listings so zoomed-in views only send the points on screen
+grid = GridIndex(listings['latitude'], listings['longitude'])
 
 # Dash App
 app = dash.Dash(__name__)
 
 app.layout = html.Div([
     html.H1("AirBnB Listings in Lisbon with Price Deviation"),
-    dcc.Graph(id='airbnb-map')
+    dcc.RadioItems(id='bin-mode', options=BIN_MODES, value='hex', inline=True),
+    dcc.Graph(id='airbnb-map'),
+    # what the map currently shows, so pans that change nothing are not re-sent
+    dcc.Store(id='map-view')
 ])
 
-@app.callback(
-    Output('airbnb-map', 'figure'),
-    Input('airbnb-map', 'relayoutData')
-)
-def update_map(relayoutData):
-    fig = px.scatter_map(
-        listings,
-        lat="latitude",
-        lon="longitude",
+
+def map_figure(df, relayoutData, bin_mode):
+    fig = binned_scatter_map(
+        df,
+        relayoutData,
+        bin_mode,
         color="price_std",
+        default_zoom=DEFAULT_ZOOM,
         size_max=15,
-        zoom=11,
         hover_name="name",
         hover_data=["price_std", "room_type", "neighbourhood_cleansed"],
-        color_continuous_scale=px.colors.sequential.Plasma
+        color_continuous_scale=px.colors.sequential.Plasma,
+        range_color=(listings['price_std'].min(), listings['price_std'].max())
     )
     fig.update_layout(
         margin={"r": 0, "t": 0, "l": 0, "b": 0}
     )
     return fig
 
+
+@functools.lru_cache(maxsize=64)
+def binned_figure(bin_mode, level):
+    # the whole city binned for one zoom level; panning at that level reuses it
+    return map_figure(listings, {'map.zoom': level}, bin_mode)
+
+
+@app.callback(
+    Output('airbnb-map', 'figure'),
+    Output('map-view', 'data'),
+    Input('airbnb-map', 'relayoutData'),
+    Input('bin-mode', 'value'),
+    State('map-view', 'data')
+)
+def update_map(relayoutData, bin_mode, view):
+    zoom = zoom_from_relayout(relayoutData, DEFAULT_ZOOM)
+    if bin_mode != 'points' and zoom < POINTS_ZOOM:
+        # bins only change size per whole zoom level
+        new_view = {'mode': bin_mode, 'level': int(zoom)}
+        if view == new_view:
+            return no_update, no_update
+        return binned_figure(bin_mode, int(zoom)), new_view
+
+    viewport = viewport_from_relayout(relayoutData)
+    if viewport is None:
+        if view == {'mode': 'points'}:
+            return no_update, no_update
+        return binned_figure('points', DEFAULT_ZOOM), {'mode': 'points'}
+
+    # raw points: send the visible area plus half a screen on every side, and
+    # nothing at all while the view stays inside what was last sent
+    if view and view.get('mode') == 'points' and 'bbox' in view and contains(view['bbox'], viewport):
+        return no_update, no_update
+    bbox = pad_viewport(viewport)
+    visible = listings.iloc[grid.query(*bbox)]
+    return map_figure(visible, relayoutData, 'points'), {'mode': 'points', 'bbox': bbox}
+
 if __name__ == '__main__':
     app.run_server(debug=True)
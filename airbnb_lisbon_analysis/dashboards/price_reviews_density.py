@@ -4,26 +4,26 @@ import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
 
+from pipeline.data import load_listings
+from pipeline.review_summary import load_review_summary
+
 # Load the datasets
-listings_detailed = pd.read_csv("data/listings.csv.gz", compression="gzip")
-reviews = pd.read_csv("data/reviews.csv.gz", compression="gzip")
+listings_detailed = load_listings()
 
 # Clean and prepare the data
 # 1. Calculate average price per listing
-listings_detailed['price'] = listings_detailed['price'].str.replace('$', '').str.replace(',', '').astype(float)
 avg_price = listings_detailed.groupby('id')['price'].mean().reset_index()
 avg_price.rename(columns={'id': 'listing_id', 'price': 'avg_price'}, inplace=True)
 
-# 2. Calculate the number of reviews per listing
-review_counts = reviews['listing_id'].value_counts().reset_index()
-#review_counts.rename(columns={'index': 'listing_id', 'listing_id': 'review_count'}, inplace=True)
+# 2. Number of reviews per listing, precomputed from reviews.csv.gz
+review_counts = load_review_summary(columns=['listing_id', 'review_count'])
 
 # 3. Merge the dataframes
 merged_data = pd.merge(listings_detailed, avg_price, left_on='id', right_on='listing_id', how='left')
 merged_data = pd.merge(merged_data, review_counts, left_on='id', right_on='listing_id', how='left')
 
 # Fill NaN review counts with 0
-merged_data['review_count'] = merged_data['count'].fillna(0)
+merged_data['review_count'] = merged_data['review_count'].fillna(0)
 
 # Create the Dash app
 app = dash.Dash(__name__)
@@ -65,7 +65,7 @@ def update_map(review_threshold):
         zoom=11,
         title="AirBnB Listings in Lisbon (Price vs. Reviews)",
     )
-    fig.update_layout(mapbox_bounds={"west": filtered_data['longitude'].min()-0.05, "east": filtered_data['longitude'].max()+0.05, "south": filtered_data['latitude'].min()-0.05, "north": filtered_data['latitude'].max()+0.05})
+    fig.update_layout(map_bounds={"west": filtered_data['longitude'].min()-0.05, "east": filtered_data['longitude'].max()+0.05, "south": filtered_data['latitude'].min()-0.05, "north": filtered_data['latitude'].max()+0.05})
     fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
 
     return fig
@@ -0,0 +1 @@
+"""Data preparation shared by the dashboards and the analysis notebooks."""
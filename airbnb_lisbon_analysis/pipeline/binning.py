@@ -0,0 +1,141 @@
+"""Server-side hexagon/square binning of listing points for the scatter maps.
+
+Instead of sending every listing as a marker, the maps send one marker per
+occupied cell with the count and the mean (or, for categories, the dominant
+value) of the colour column. The cell size follows the map zoom, and past
+``POINTS_ZOOM`` the raw points are sent again.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from pipeline.reducers import mode_by
+
+BIN_MODES = {"hex": "Hexagons", "square": "Squares", "points": "Points"}
+# at or beyond this zoom the raw listings are few enough to draw directly
+POINTS_ZOOM = 15
+# approximate cell width on screen
+CELL_PIXELS = 24
+
+
+def zoom_from_relayout(relayout_data, default):
+    """Map zoom from a graph's ``relayoutData``, or ``default`` before any interaction."""
+    for key in ("map.zoom", "mapbox.zoom"):
+        if relayout_data and key in relayout_data:
+            return float(relayout_data[key])
+    return default
+
+
+def cell_size(zoom, pixels=CELL_PIXELS):
+    """Cell size in degrees that covers about ``pixels`` screen pixels at ``zoom``."""
+    return pixels * 360 / (256 * 2 ** zoom)
+
+
+def square_cells(x, y, size):
+    """Integer (column, row) of the square cell of every point, and the cell centre function."""
+    ix = np.floor(x / size).astype(np.int64)
+    iy = np.floor(y / size).astype(np.int64)
+    return ix, iy, lambda ix, iy: ((ix + 0.5) * size, (iy + 0.5) * size)
+
+
+def hex_cells(x, y, size):
+    """Axial (q, r) coordinates of the pointy-top hexagon of every point.
+
+    ``size`` is the hexagon's circumradius; points are rounded to the
+    nearest hexagon centre in cube coordinates.
+    """
+    q = (math.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    def centre(q, r):
+        return size * math.sqrt(3) * (q + r / 2), size * 1.5 * r
+
+    return rq.astype(np.int64), rr.astype(np.int64), centre
+
+
+def bin_points(df, zoom, mode="hex", color="price", lat="latitude", lon="longitude", points_zoom=POINTS_ZOOM):
+    """Aggregate ``df`` into map cells sized for ``zoom``.
+
+    Args:
+        df (pandas.DataFrame): Points with ``lat``/``lon`` and ``color`` columns.
+        zoom (float): Current map zoom.
+        mode (str): ``"hex"``, ``"square"`` or ``"points"`` (no binning).
+        color (str): Column to summarise per cell: the mean for numeric
+            columns, the most frequent value otherwise.
+        points_zoom (float): Zoom from which raw points are returned.
+
+    Returns:
+        tuple: ``(frame, binned)``. When binned, ``frame`` has one row per
+        occupied cell with ``lat``/``lon`` at the cell centre, ``color`` and
+        ``count``; otherwise it is ``df`` itself.
+    """
+    if mode == "points" or zoom >= points_zoom or df.empty:
+        return df, False
+
+    df = df.dropna(subset=[lat, lon])
+    if df.empty:
+        return df, False
+    # degrees of longitude shrink with latitude; scale them so cells are
+    # roughly as wide as they are tall on the map
+    scale = math.cos(math.radians(df[lat].mean()))
+    x = df[lon].to_numpy(dtype=float) * scale
+    y = df[lat].to_numpy(dtype=float)
+    cells = hex_cells if mode == "hex" else square_cells
+    ix, iy, centre = cells(x, y, cell_size(zoom))
+    ix_min, iy_min = ix.min(), iy.min()
+
+    # one int64 key per cell, so grouping is a 1-d unique + bincount
+    ix, iy = ix - ix_min, iy - iy_min
+    rows = iy.max() + 1
+    keys, inverse = np.unique(ix * rows + iy, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(keys))
+    centre_x, centre_y = centre(keys // rows + ix_min, keys % rows + iy_min)
+
+    binned = pd.DataFrame({lat: centre_y, lon: centre_x / scale, "count": counts})
+    values = df[color]
+    if pd.api.types.is_numeric_dtype(values):
+        present = values.notna().to_numpy()
+        sums = np.bincount(inverse[present], weights=values.to_numpy(dtype=float)[present], minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            binned[color] = sums / np.bincount(inverse[present], minlength=len(keys))
+    else:
+        modes = mode_by(pd.DataFrame({"cell": inverse, color: values.to_numpy()}), "cell", column=color)
+        binned[color] = modes[color].reindex(range(len(keys))).to_numpy()
+    return binned, True
+
+
+def binned_scatter_map(df, relayout_data, mode, color, default_zoom, size=None, hover_name=None, hover_data=None,
+                       **kwargs):
+    """``px.scatter_map`` of ``df``, binned for the zoom in ``relayout_data``.
+
+    Raw points keep ``size``, ``hover_name`` and ``hover_data``; binned
+    cells show their count and summarised ``color`` instead and are sized
+    by count. Other keyword arguments go to ``px.scatter_map`` unchanged,
+    and the layout's ``uirevision`` keeps the user's pan and zoom across
+    re-renders.
+    """
+    zoom = zoom_from_relayout(relayout_data, default_zoom)
+    data, binned = bin_points(df, zoom, mode, color)
+    if binned:
+        fig = px.scatter_map(
+            data, lat="latitude", lon="longitude", color=color, size="count",
+            hover_data={"count": True, color: True, "latitude": False, "longitude": False},
+            zoom=default_zoom, **kwargs
+        )
+    else:
+        fig = px.scatter_map(
+            data, lat="latitude", lon="longitude", color=color, size=size,
+            hover_name=hover_name, hover_data=hover_data, zoom=default_zoom, **kwargs
+        )
+    fig.update_layout(uirevision='map')
+    return fig
@@ -0,0 +1,109 @@
+"""Calendar price statistics computed in one streaming pass.
+
+``calendar.csv.gz`` has a row per listing and day, so loading it whole grows
+with the length of the history. Here it is read chunk by chunk and every
+chunk is folded into running (count, mean, M2) accumulators per listing,
+week and month, so peak memory depends on the chunk size and the number of
+listings and periods, not on the number of calendar rows.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data import CHUNK_SIZE, DATA_DIR, DATASETS, cached_tables, iter_source
+
+CalendarStats = namedtuple("CalendarStats", ["price_std", "weekly", "monthly"])
+
+
+class RunningStats:
+    """Count, mean and M2 (sum of squared deviations) of values per key.
+
+    ``update`` reduces a chunk per key and merges it into the running totals
+    with Chan's parallel form of Welford's update, which stays numerically
+    stable where a running sum of squares would not.
+    """
+
+    def __init__(self):
+        self.stats = pd.DataFrame({"count": [], "mean": [], "m2": []}, dtype="float64")
+
+    def update(self, keys, values):
+        values = pd.Series(np.asarray(values, dtype="float64"), index=keys.index)
+        present = values.notna()
+        grouped = values[present].groupby(keys[present]).agg(["count", "mean", "var"])
+        chunk = pd.DataFrame({
+            "count": grouped["count"].astype("float64"),
+            "mean": grouped["mean"],
+            "m2": (grouped["var"] * (grouped["count"] - 1)).fillna(0.0),
+        })
+        self.merge(chunk)
+
+    def merge(self, chunk):
+        index = self.stats.index.union(chunk.index)
+        a = self.stats.reindex(index, fill_value=0.0)
+        b = chunk.reindex(index, fill_value=0.0)
+        count = a["count"] + b["count"]
+        delta = b["mean"] - a["mean"]
+        share = (b["count"] / count).fillna(0.0)
+        self.stats = pd.DataFrame({
+            "count": count,
+            "mean": a["mean"] + delta * share,
+            "m2": a["m2"] + b["m2"] + delta ** 2 * a["count"] * share,
+        })
+
+    def result(self):
+        """``count``, ``mean`` and sample ``std`` (NaN for a single value) per key."""
+        stats = self.stats
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(stats["m2"] / (stats["count"] - 1)).where(stats["count"] > 1)
+        return pd.DataFrame({"count": stats["count"].astype("int64"), "mean": stats["mean"], "std": std})
+
+
+def _period_table(stats):
+    result = stats.result()
+    # label periods by their last day, as ``resample(freq)`` does
+    return pd.DataFrame({
+        "date": result.index.to_timestamp(how="end").normalize(),
+        "avg_price": result["mean"].to_numpy(),
+        "days": result["count"].to_numpy(),
+    })
+
+
+def calendar_stats(data_dir=DATA_DIR, until=None, chunksize=CHUNK_SIZE):
+    """Per-listing price spread and weekly/monthly average prices.
+
+    Args:
+        data_dir (str): Directory holding ``calendar.csv.gz``.
+        until (pandas.Timestamp, optional): Ignore calendar days from this
+            date on, e.g. ``pd.Timestamp.now()`` to leave out future prices.
+        chunksize (int): Calendar rows parsed at a time.
+
+    Returns:
+        CalendarStats: ``price_std`` with ``listing_id``, ``price_mean``,
+        ``price_std`` and ``days`` per listing; ``weekly`` and ``monthly``
+        with ``date`` (last day of the period), ``avg_price`` and ``days``.
+    """
+    listings, weeks, months = RunningStats(), RunningStats(), RunningStats()
+    for chunk in iter_source("calendar", data_dir, ["listing_id", "date", "price"], chunksize):
+        if until is not None:
+            chunk = chunk[chunk["date"] < until]
+        listings.update(chunk["listing_id"], chunk["price"])
+        weeks.update(chunk["date"].dt.to_period("W"), chunk["price"])
+        months.update(chunk["date"].dt.to_period("M"), chunk["price"])
+
+    per_listing = listings.result()
+    price_std = pd.DataFrame({
+        "listing_id": per_listing.index.astype("int64"),
+        "price_mean": per_listing["mean"].to_numpy(),
+        "price_std": per_listing["std"].to_numpy(),
+        "days": per_listing["count"].to_numpy(),
+    })
+    return CalendarStats(price_std, _period_table(weeks), _period_table(months))
+
+
+def load_calendar_stats(data_dir=DATA_DIR):
+    """``calendar_stats`` over the whole calendar, cached until ``calendar.csv.gz`` changes."""
+    # one streaming pass fills all three tables when any of them is missing
+    names = [f"calendar_{table}" for table in CalendarStats._fields]
+    tables = cached_tables(names, [DATASETS["calendar"]["file"]], lambda: calendar_stats(data_dir), data_dir=data_dir)
+    return CalendarStats(*(tables[name] for name in names))
@@ -0,0 +1,287 @@
+"""Cached access to the Inside Airbnb datasets.
+
+The first load of a dataset parses the gzipped CSV once and stores it as a
+compressed Parquet file under ``<data_dir>/.cache``, named after a hash of
+the source file. Later loads (including other processes) read the Parquet
+file directly, and a new snapshot dropped into ``data/`` gets a new hash and
+is converted again on its next load.
+
+Price columns are stored as float32 (see ``pipeline.prices``), so callers
+never have to strip currency strings themselves.
+"""
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+from pipeline.prices import parse_price
+
+DATA_DIR = "data"
+CACHE_DIR = ".cache"
+# bump when the stored schema changes so existing caches are rebuilt
+CACHE_VERSION = 2
+CHUNK_SIZE = 1_000_000
+
+DATASETS = {
+    "listings": {
+        "file": "listings.csv.gz",
+        "dates": ["last_scraped", "host_since", "calendar_last_scraped", "first_review", "last_review"],
+        "dtype": {"price": "string"},
+        "prices": ["price"],
+    },
+    "reviews": {
+        "file": "reviews.csv.gz",
+        "dates": ["date"],
+        "dtype": {"comments": "string", "reviewer_name": "string"},
+        "prices": [],
+    },
+    "review_languages": {
+        "file": "review_languages.csv.gz",
+        "dates": [],
+        "dtype": {"language": "string"},
+        "prices": [],
+    },
+    "calendar": {
+        "file": "calendar.csv.gz",
+        "dates": ["date"],
+        # adjusted_price is almost always empty, which makes pandas guess
+        # float for some chunks and object for others
+        "dtype": {"price": "string", "adjusted_price": "string", "available": "string"},
+        "prices": ["price", "adjusted_price"],
+    },
+}
+
+_digests = {}
+
+
+def file_digest(path):
+    """Content hash of ``path``, memoised per (size, mtime) within the process."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _digests:
+        with open(path, "rb") as fp:
+            _digests[key] = hashlib.file_digest(fp, "blake2b").hexdigest()[:16]
+    return _digests[key]
+
+
+def source_path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, DATASETS[name]["file"])
+
+
+def cache_path(name, data_dir=DATA_DIR):
+    """Parquet file the current snapshot of ``name`` is (or will be) cached in."""
+    digest = file_digest(source_path(name, data_dir))
+    return os.path.join(data_dir, CACHE_DIR, f"{name}-v{CACHE_VERSION}-{digest}.parquet")
+
+
+def iter_source(name, data_dir=DATA_DIR, columns=None, chunksize=CHUNK_SIZE):
+    """Yield the original CSV for ``name`` in typed chunks of ``chunksize`` rows.
+
+    Only ``columns`` are parsed, with dates as datetimes and prices as
+    float32, so a consumer that reduces each chunk before asking for the
+    next never holds more than one chunk of the file.
+    """
+    spec = DATASETS[name]
+    usecols = None if columns is None else lambda column: column in columns
+    reader = pd.read_csv(
+        source_path(name, data_dir),
+        compression="gzip",
+        dtype=spec["dtype"],
+        usecols=usecols,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        yield _prepare(chunk, spec)
+
+
+def iter_dataset(name, data_dir=DATA_DIR, columns=None, chunksize=CHUNK_SIZE):
+    """Yield ``name`` in typed chunks of about ``chunksize`` rows, from its Parquet cache.
+
+    The cache is streamed one record batch at a time, so reading it costs
+    neither a CSV parse nor the memory of the whole table. When the current
+    snapshot has no cache yet, the CSV is parsed in chunks that are yielded
+    as they are appended to a new cache file (see ``_convert_in_chunks``),
+    so the next pass over it is a Parquet read. Without pyarrow the CSV is
+    streamed with ``iter_source``.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        yield from iter_source(name, data_dir, columns, chunksize)
+        return
+    path = cache_path(name, data_dir)
+    if not os.path.exists(path):
+        yield from _convert_in_chunks(name, path, data_dir, columns, chunksize)
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+def _convert_in_chunks(name, path, data_dir, columns, chunksize):
+    """Yield the CSV of ``name`` chunk by chunk while writing every column of it to ``path``.
+
+    A chunk whose column types cannot be cast to those of the first chunk
+    (e.g. integers in one chunk, missing values in the next) ends the
+    conversion: the remaining chunks are still yielded, and the cache is
+    left for ``load_dataset`` to write from the whole table. So is a file
+    the consumer stopped reading halfway.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = None
+    converting = True
+    try:
+        for chunk in iter_source(name, data_dir, chunksize=chunksize):
+            if converting:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                try:
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+                    writer.write_table(table.cast(writer.schema))
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    converting = False
+            yield chunk if columns is None else chunk[columns]
+        if writer is not None:
+            writer.close()
+            writer = None
+            if converting:
+                os.replace(tmp_path, path)
+                _remove_stale(name, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_source(name, data_dir=DATA_DIR, columns=None):
+    """Parse the original CSV for ``name`` with the dataset's dtypes.
+
+    The file is read in chunks and each chunk is typed before the next one
+    is parsed, so the raw price strings of the whole file are never held at
+    once.
+    """
+    return pd.concat(iter_source(name, data_dir, columns), ignore_index=True)
+
+
+def _prepare(df, spec):
+    for column in spec["dates"]:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    for column in spec["prices"]:
+        if column in df.columns:
+            df[column] = parse_price(df[column])
+    return df
+
+
+def write_cache(df, name, path):
+    """Write ``df`` to the Parquet file ``path`` and remove older ``<name>-*`` files next to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write under a private name and rename, so a worker starting up at the
+    # same time never reads a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, compression="zstd", index=False)
+    os.replace(tmp_path, path)
+    _remove_stale(name, path)
+
+
+def _remove_stale(name, path):
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f"{name}-*.parquet")):
+        if stale != path:
+            os.remove(stale)
+
+
+def load_dataset(name, columns=None, data_dir=DATA_DIR):
+    """Load one of the ``DATASETS`` as a DataFrame, converting it to Parquet on first use.
+
+    Args:
+        name (str): Dataset name, e.g. ``"listings"`` or ``"calendar"``.
+        columns (list, optional): Only read these columns. Parquet reads
+            skip the other columns entirely.
+        data_dir (str): Directory holding the ``*.csv.gz`` files.
+    """
+    path = cache_path(name, data_dir)
+    try:
+        if not os.path.exists(path):
+            write_cache(read_source(name, data_dir), name, path)
+        return pd.read_parquet(path, columns=columns)
+    except ImportError:
+        # no parquet engine installed, fall back to parsing the CSV
+        return read_source(name, data_dir, columns)
+
+
+def sources_digest(sources, data_dir=DATA_DIR):
+    """Combined content hash of several files inside ``data_dir``."""
+    return hashlib.blake2b(
+        "".join(file_digest(os.path.join(data_dir, source)) for source in sources).encode()
+    ).hexdigest()[:16]
+
+
+def cached_table(name, sources, build, columns=None, data_dir=DATA_DIR, read=pd.read_parquet):
+    """Load a table derived from other files, rebuilding it when any of them changes.
+
+    Args:
+        name (str): Name of the derived table, used for the cache file.
+        sources (list): File names inside ``data_dir`` the table is built from.
+        build (callable): Called without arguments to compute the table.
+        columns (list, optional): Only return these columns.
+        data_dir (str): Directory holding the source files.
+        read (callable): Reads the cache file back, e.g.
+            ``geopandas.read_parquet`` for tables with geometries.
+    """
+    return cached_tables([name], sources, lambda: [build()], columns, data_dir, read)[name]
+
+
+def cached_tables(names, sources, build, columns=None, data_dir=DATA_DIR, read=pd.read_parquet, load=None):
+    """Load tables computed together from the same files, e.g. in one pass over them.
+
+    When any requested table is missing, ``build`` runs once and every one
+    of ``names`` is cached, so loading another of them later, from this or
+    any other process, is a cache hit rather than a second pass.
+
+    Args:
+        names (list): Names of the derived tables, in the order ``build``
+            returns them.
+        sources (list): File names inside ``data_dir`` the tables are built from.
+        build (callable): Called without arguments to compute all tables.
+        columns (list, optional): Only return these columns.
+        data_dir (str): Directory holding the source files.
+        read (callable): Reads a cache file back.
+        load (list, optional): Only return these of ``names`` (default all).
+
+    Returns:
+        dict: Table name -> DataFrame, for the ``load`` tables.
+    """
+    load = names if load is None else load
+    digest = sources_digest(sources, data_dir)
+    paths = {name: os.path.join(data_dir, CACHE_DIR, f"{name}-v{CACHE_VERSION}-{digest}.parquet") for name in names}
+    built = None
+    try:
+        if not all(os.path.exists(paths[name]) for name in load):
+            built = dict(zip(names, build()))
+            for name, df in built.items():
+                write_cache(df, name, paths[name])
+        return {name: read(paths[name], columns=columns) for name in load}
+    except ImportError:
+        built = built or dict(zip(names, build()))
+        return {name: built[name] if columns is None else built[name][columns] for name in load}
+
+
+def load_listings(columns=None, data_dir=DATA_DIR):
+    return load_dataset("listings", columns, data_dir)
+
+
+def load_reviews(columns=None, data_dir=DATA_DIR):
+    return load_dataset("reviews", columns, data_dir)
+
+
+def load_review_languages(columns=None, data_dir=DATA_DIR):
+    return load_dataset("review_languages", columns, data_dir)
+
+
+def load_calendar(columns=None, data_dir=DATA_DIR):
+    return load_dataset("calendar", columns, data_dir)
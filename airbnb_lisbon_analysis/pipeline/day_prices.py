@@ -0,0 +1,75 @@
+"""Calendar price of listings on given days, looked up without merging frames.
+
+Each (listing, day) pair is packed into one int64 key: the position of the
+listing among the requested listings (Airbnb ids no longer fit in a few
+bits) shifted left by ``DAY_BITS``, plus the day number since 1970. The
+requested keys are sorted once and every calendar row is located with a
+binary search, so the calendar is never joined into a wide intermediate
+frame and can be streamed in chunks.
+"""
+import numpy as np
+import pandas as pd
+
+# day numbers up to 2**17 (year 2328)
+DAY_BITS = 17
+
+
+def _days(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class DayPrices:
+    """Prices of a fixed list of (listing_id, date) pairs, filled from calendar rows.
+
+    Where the calendar has several rows for a pair the first one wins, as
+    with ``drop_duplicates`` before a merge.
+    """
+
+    def __init__(self, listing_ids, dates):
+        listing_codes, listings = pd.factorize(np.asarray(listing_ids), sort=True)
+        self.listings = pd.Index(listings)
+        keys = (listing_codes.astype(np.int64) << DAY_BITS) | _days(dates)
+        # unique keys come back sorted; ``inverse`` maps them back to the pairs
+        self.keys, self.inverse = np.unique(keys, return_inverse=True)
+        self.values = np.full(len(self.keys), np.nan, dtype=np.float32)
+        self.found = np.zeros(len(self.keys), dtype=bool)
+
+    def update(self, calendar):
+        """Take the prices of the pairs found in ``calendar`` (``listing_id``, ``date``, ``price``)."""
+        listing_codes = self.listings.get_indexer(calendar["listing_id"].to_numpy())
+        known = listing_codes >= 0
+        if not known.any():
+            return
+        keys = (listing_codes[known].astype(np.int64) << DAY_BITS) | _days(calendar["date"].to_numpy()[known])
+        positions = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        rows = np.flatnonzero(self.keys[positions] == keys)
+        # first calendar row per pair, among the pairs still without a price
+        positions, first = np.unique(positions[rows], return_index=True)
+        new = ~self.found[positions]
+        prices = calendar["price"].to_numpy(dtype=np.float32)[known][rows[first[new]]]
+        self.values[positions[new]] = prices
+        self.found[positions[new]] = True
+
+    def prices(self):
+        """float32 price of every pair, NaN where no calendar row matched."""
+        return self.values[self.inverse]
+
+
+def day_prices(listing_ids, dates, calendar):
+    """Calendar price of each listing on the matching date.
+
+    Args:
+        listing_ids, dates (array-like): The (listing, day) pairs, e.g. the
+            ``listing_id`` and ``date`` of reviews.
+        calendar (pandas.DataFrame or iterable): ``listing_id``, ``date``
+            and numeric ``price``, as one frame or as chunks (e.g. from
+            ``iter_source``).
+
+    Returns:
+        numpy.ndarray: float32 prices aligned to the pairs, NaN where the
+        calendar has no row for the pair.
+    """
+    lookup = DayPrices(listing_ids, dates)
+    for chunk in [calendar] if isinstance(calendar, pd.DataFrame) else calendar:
+        lookup.update(chunk)
+    return lookup.prices()
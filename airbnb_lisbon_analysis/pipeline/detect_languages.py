@@ -0,0 +1,115 @@
+"""Label review comments with their language (``review_languages.csv.gz``).
+
+    python -m pipeline.detect_languages --data-dir data --workers 4
+
+Comments are streamed from ``reviews.csv.gz`` in batches, reviews whose id
+already has a language are skipped, and the rest are identified offline
+with ``langdetect`` across a process pool. Every finished batch is appended
+to ``review_languages.csv.gz`` as a new gzip member, so an interrupted run
+resumes where it stopped. Comments that are empty or cannot be identified
+get an empty language.
+"""
+import argparse
+import gzip
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+
+from pipeline.data import DATA_DIR, DATASETS, iter_source
+
+BATCH_SIZE = 20_000
+# comments per task sent to a worker
+TASK_SIZE = 500
+
+
+def _init_worker(seed):
+    from langdetect import DetectorFactory
+
+    # langdetect samples n-grams at random; seed it so reruns give the same labels
+    DetectorFactory.seed = seed
+
+
+def detect_languages(comments):
+    """Language code (e.g. ``"en"``, ``"pt"``) of every comment, None where unknown."""
+    from langdetect import LangDetectException, detect
+
+    languages = []
+    for comment in comments:
+        try:
+            languages.append(detect(comment) if comment and comment.strip() else None)
+        except LangDetectException:
+            languages.append(None)
+    return languages
+
+
+def labelled_ids(data_dir=DATA_DIR):
+    """Ids of the reviews that already have a row in ``review_languages.csv.gz``."""
+    path = os.path.join(data_dir, DATASETS["review_languages"]["file"])
+    if not os.path.exists(path):
+        return pd.Index([], dtype="int64")
+    return pd.Index(pd.read_csv(path, usecols=["id"])["id"].unique())
+
+
+def _append(path, batch):
+    header = not os.path.exists(path)
+    # gzip files may consist of several members; readers see one continuous CSV
+    with gzip.open(path, "at", newline="") as fp:
+        batch.to_csv(fp, index=False, header=header)
+
+
+def label_reviews(data_dir=DATA_DIR, workers=None, batch_size=BATCH_SIZE, seed=0, log=print):
+    """Detect and append the language of every unlabelled review in ``data_dir``.
+
+    Args:
+        data_dir (str): Directory with ``reviews.csv.gz``; the labels go to
+            ``review_languages.csv.gz`` next to it.
+        workers (int, optional): Processes to use, all cores by default.
+        batch_size (int): Reviews read and appended at a time.
+        seed (int): Seed for the language identifier.
+        log (callable): Receives a progress line per batch.
+
+    Returns:
+        int: Number of reviews labelled.
+    """
+    workers = workers or os.cpu_count()
+    path = os.path.join(data_dir, DATASETS["review_languages"]["file"])
+    done = labelled_ids(data_dir)
+
+    labelled = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(seed,)) as pool:
+        for chunk in iter_source("reviews", data_dir, ["id", "comments"], batch_size):
+            chunk = chunk[~chunk["id"].isin(done)]
+            if chunk.empty:
+                continue
+            batch_start = time.perf_counter()
+            comments = chunk["comments"].fillna("").tolist()
+            tasks = [comments[i:i + TASK_SIZE] for i in range(0, len(comments), TASK_SIZE)]
+            languages = [language for result in pool.imap(detect_languages, tasks) for language in result]
+            _append(path, pd.DataFrame({"id": chunk["id"].to_numpy(), "language": languages}))
+
+            labelled += len(chunk)
+            rate = len(chunk) / (time.perf_counter() - batch_start)
+            log(f"{labelled:,} reviews labelled; {rate:,.0f} reviews/s, {rate / workers:,.0f} reviews/s per core")
+
+    if labelled:
+        rate = labelled / (time.perf_counter() - start)
+        log(f"done: {labelled:,} reviews at {rate:,.0f} reviews/s ({rate / workers:,.0f} per core, {workers} workers)")
+    else:
+        log("every review already has a language")
+    return labelled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect the language of unlabelled review comments")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    label_reviews(args.data_dir, args.workers, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Callback outputs shared across users, keyed by their inputs and the data they came from.
+
+Dashboard callbacks are deterministic: the same quarter selection or slider
+position gives the same figure for every user. ``FigureCache.memoize``
+keeps the results in an in-process LRU and, optionally, in a directory
+shared by all workers on the machine, so a popular selection is computed
+once per dataset version rather than once per request and worker.
+"""
+import collections
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+
+ENV_VAR = "AIRBNB_FIGURE_CACHE_DIR"
+
+
+def _canonical(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return repr(value)
+
+
+def canonical_key(*parts):
+    """Stable hash of JSON-like ``parts``; dict order and set order do not matter."""
+    text = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=_canonical)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class FigureCache:
+    """Size-bounded LRU cache of callback results.
+
+    Args:
+        maxsize (int): Results kept in memory per process.
+        version (str or callable): Identifies the data the results are built
+            from and the code building them, e.g. a digest of the source
+            files and a version number bumped with the callbacks; part of
+            every key, so neither a new snapshot nor a new deploy serves old
+            figures. A callable is evaluated
+            on first use, keeping the cache free to declare at import.
+        directory (str, optional): Also keep results as pickles in this
+            directory, shared by every worker that points at it. Defaults
+            to ``$AIRBNB_FIGURE_CACHE_DIR``; unset means memory only.
+        max_files (int): Results kept in ``directory``; the least recently
+            used files are removed beyond that.
+    """
+
+    def __init__(self, maxsize=256, version="", directory=None, max_files=2048):
+        self.maxsize = maxsize
+        self._version = version
+        self.directory = directory if directory is not None else os.environ.get(ENV_VAR) or None
+        self.max_files = max_files
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @functools.cached_property
+    def version(self):
+        return self._version() if callable(self._version) else self._version
+
+    def memoize(self, func):
+        """Decorator caching ``func`` by its (canonicalized) arguments."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = canonical_key(func.__module__, func.__qualname__, self.version, args, kwargs)
+            found, value = self.get(key)
+            if not found:
+                value = func(*args, **kwargs)
+                self.put(key, value)
+            return value
+
+        wrapper.cache = self
+        return wrapper
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+        if self.directory:
+            path = os.path.join(self.directory, f"{key}.pkl")
+            try:
+                with open(path, "rb") as fp:
+                    value = pickle.load(fp)
+                # file times drive the on-disk LRU
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return True, value
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.directory:
+            self._write(key, value)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _write(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{key}.pkl")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")]
+        if len(files) > self.max_files:
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:len(files) - self.max_files]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    # already evicted by another worker
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
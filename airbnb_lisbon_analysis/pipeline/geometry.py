@@ -0,0 +1,85 @@
+"""Simplified parish polygons served once as GeoJSON instead of inside every figure."""
+import json
+
+import flask
+
+# half a screen pixel at the given zoom level, in degrees of longitude
+PIXEL_FRACTION = 0.5
+# deepest zoom of plotly's ``map`` subplots (MapLibre's default maximum)
+MAX_ZOOM = 22
+
+
+def tolerance_for_zoom(zoom, pixels=PIXEL_FRACTION):
+    """Simplification tolerance (degrees) that is invisible at map ``zoom``."""
+    return pixels * 360 / (256 * 2 ** zoom)
+
+
+class ParishGeometry:
+    """GeoJSON of the parish polygons, simplified and serialized once per tolerance.
+
+    Figures reference the polygons by URL (``geojson=url`` with
+    ``featureidkey="id"``), so the browser downloads them once and callback
+    responses only carry the location ids and colour values.
+
+    Args:
+        gdf (geopandas.GeoDataFrame or callable): Parish polygons, or a
+            function returning them, called on the first use of ``gdf`` so a
+            dashboard can register the route before loading any data.
+        id_column (str): Column used as the GeoJSON feature id, matched
+            against the figure's ``locations``.
+    """
+
+    def __init__(self, gdf, id_column="id"):
+        self._source = gdf
+        self._gdf = None
+        self.id_column = id_column
+        self._strings = {}
+
+    @property
+    def gdf(self):
+        if self._gdf is None:
+            gdf = self._source() if callable(self._source) else self._source
+            self._gdf = gdf.to_crs("EPSG:4326") if gdf.crs is not None else gdf
+        return self._gdf
+
+    def simplified(self, tolerance):
+        """Polygons simplified without opening gaps or overlaps between neighbours."""
+        if tolerance <= 0:
+            return self.gdf.geometry
+        try:
+            # simplifies shared borders once, so neighbouring parishes keep
+            # meeting exactly (needs shapely >= 2.1)
+            return self.gdf.geometry.simplify_coverage(tolerance)
+        except (AttributeError, NotImplementedError):
+            return self.gdf.geometry.simplify(tolerance, preserve_topology=True)
+
+    def geojson_string(self, tolerance=0.0):
+        if tolerance not in self._strings:
+            features = [
+                {"type": "Feature", "id": parish_id, "properties": {}, "geometry": geometry.__geo_interface__}
+                for parish_id, geometry in zip(self.gdf[self.id_column].tolist(), self.simplified(tolerance))
+            ]
+            self._strings[tolerance] = json.dumps({"type": "FeatureCollection", "features": features})
+        return self._strings[tolerance]
+
+    def geojson(self, tolerance=0.0):
+        return json.loads(self.geojson_string(tolerance))
+
+    def serve(self, app, path="/geometry/parishes.geojson"):
+        """Register ``path`` on the Dash app's server and return the URL for figures.
+
+        The polygons are simplified for ``MAX_ZOOM``, so the borders stay
+        exact to the eye however far the user zooms in; the GeoJSON is still
+        built once and downloaded once per browser.
+        """
+
+        def parishes_geojson():
+            response = flask.Response(
+                self.geojson_string(tolerance_for_zoom(MAX_ZOOM)), mimetype="application/geo+json"
+            )
+            response.cache_control.public = True
+            response.cache_control.max_age = 3600
+            return response
+
+        app.server.add_url_rule(path, endpoint=path, view_func=parishes_geojson)
+        return app.get_relative_path(path)
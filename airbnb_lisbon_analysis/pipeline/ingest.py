@@ -0,0 +1,190 @@
+"""Incremental refresh of the review aggregates from a new snapshot.
+
+    python -m pipeline.ingest --data-dir data
+
+Drop the new Inside Airbnb files into ``data/`` and run the command. The
+snapshot is compared review by review with the state saved by the previous
+run, and only the (parish, quarter) rows of ``parish_data_quarterly.csv``,
+the listings and the parishes of ``parish_data.csv`` touched by new,
+changed or removed reviews are recomputed. A review counts as changed when
+its listing, date, language or parish moved, or when the calendar price of
+its listing on the review day changed. The first run, without saved state,
+builds everything.
+
+Calendar prices are only looked up for reviews that are new or moved to
+another listing or day; the others keep the price saved by the previous
+run, unless ``calendar.csv.gz`` itself changed since, in which case every
+price is looked up again.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data import (
+    DATA_DIR, file_digest, iter_dataset, load_review_languages, load_reviews, source_path, write_cache,
+)
+from pipeline.languages import parish_languages
+from pipeline.parishes import load_listing_parishes
+from pipeline.quarterly import QUARTERLY_FILE, aggregate_quarterly, review_facts
+from pipeline.reducers import mode_by
+
+STATE_DIR = "ingest"
+PARISH_LANGUAGE_FILE = "parish_data.csv"
+# the review_facts columns that decide which aggregates a review feeds
+COMPARED = ["listing_id", "date", "parish_id", "language", "price"]
+# a review keeps its saved price while these match and the calendar is unchanged
+PRICE_KEYS = ["id", "listing_id", "date"]
+
+
+def changed_reviews(old, new):
+    """Ids of reviews added, removed or changed (in any ``COMPARED`` column) between two fact tables."""
+    merged = new[["id"] + COMPARED].merge(
+        old[["id"] + COMPARED], on="id", how="outer", suffixes=("", "_old"), indicator=True
+    )
+    changed = merged["_merge"] != "both"
+    for column in COMPARED:
+        a, b = merged[column], merged[f"{column}_old"]
+        same = (a == b).fillna(False) | (a.isna() & b.isna())
+        changed |= ~same.astype(bool)
+    return merged.loc[changed, "id"]
+
+
+def listing_reviews(facts):
+    """Per listing: parish, number of reviews and most frequent review language."""
+    grouped = facts.groupby("listing_id")
+    result = pd.DataFrame({"parish_id": grouped["parish_id"].first(), "num_reviews": grouped.size()})
+    result["language"] = mode_by(facts, "listing_id")["language"]
+    return result.reset_index()
+
+
+def _replace_rows(stored, fresh, keys, touched):
+    """``stored`` with the rows of the ``touched`` keys replaced by ``fresh``."""
+    if stored is None:
+        return fresh
+    touched = touched[keys].drop_duplicates()
+    stale = stored[keys].merge(touched, on=keys, how="left", indicator=True)["_merge"].eq("both").to_numpy()
+    return pd.concat([stored[~stale], fresh], ignore_index=True).sort_values(keys, ignore_index=True)
+
+
+def _read_json(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def _read_state(path, reader=pd.read_parquet):
+    return reader(path) if os.path.exists(path) else None
+
+
+def known_prices(reviews, old_facts):
+    """Saved price of every review whose ``PRICE_KEYS`` are in ``old_facts``, NaN for the others."""
+    old_facts = old_facts.drop_duplicates("id")
+    # review ids are unique, so the saved row is found by id alone and the
+    # other keys are compared in place
+    position = pd.Index(old_facts["id"]).get_indexer(reviews["id"])
+    found = position >= 0
+    for key in PRICE_KEYS[1:]:
+        found &= reviews[key].to_numpy() == old_facts[key].to_numpy()[position]
+    prices = np.full(len(reviews), np.nan, dtype=np.float32)
+    prices[found] = old_facts["price"].to_numpy(dtype=np.float32)[position[found]]
+    return prices
+
+
+def ingest(data_dir=DATA_DIR):
+    """Bring the stored aggregates in ``data_dir`` up to date with its current snapshot.
+
+    Returns:
+        dict: Number of calendar ``price_lookups``, of ``changed_reviews``
+        and of recomputed ``parish_quarters``, ``listings`` and ``parishes``.
+    """
+    state_dir = os.path.join(data_dir, STATE_DIR)
+    facts_path = os.path.join(state_dir, "review_facts.parquet")
+    listings_path = os.path.join(state_dir, "listing_reviews.parquet")
+    quarterly_path = os.path.join(data_dir, QUARTERLY_FILE)
+    parish_path = os.path.join(data_dir, PARISH_LANGUAGE_FILE)
+    # digest of the calendar the saved prices were looked up in
+    sources_path = os.path.join(state_dir, "sources.json")
+
+    old_facts = _read_state(facts_path)
+    # prices are float32 throughout, so untouched rows are written back unchanged
+    stored_quarterly = _read_state(quarterly_path, lambda path: pd.read_csv(path, dtype={"avg_price": "float32"}))
+    stored_listings = _read_state(listings_path)
+    stored_parishes = _read_state(parish_path, pd.read_csv)
+    sources = _read_state(sources_path, _read_json)
+    first_run = any(stored is None for stored in (old_facts, stored_quarterly, stored_listings, stored_parishes))
+
+    reviews = load_reviews(columns=["id", "listing_id", "date"], data_dir=data_dir)
+    calendar_digest = file_digest(source_path("calendar", data_dir))
+    same_calendar = not first_run and sources is not None and sources.get("calendar") == calendar_digest
+    prices = known_prices(reviews, old_facts) if same_calendar else None
+    facts = review_facts(
+        reviews,
+        load_review_languages(data_dir=data_dir),
+        # streamed from the cache when there is one, and only read for the
+        # reviews without a saved price
+        iter_dataset("calendar", data_dir, ["listing_id", "date", "price"]),
+        load_listing_parishes(data_dir),
+        known_prices=prices,
+    )
+    facts["parish_id"] = facts["parish_id"].astype("Int64")
+
+    if first_run:
+        # no previous run: every stored aggregate is rebuilt from scratch
+        stored_quarterly = stored_listings = stored_parishes = None
+        touched = facts
+    else:
+        ids = changed_reviews(old_facts, facts)
+        # a changed review can leave one (parish, quarter) and join another
+        touched = pd.concat([old_facts[old_facts["id"].isin(ids)], facts[facts["id"].isin(ids)]])
+
+    quarters = touched[["parish_id", "quarter"]].dropna().astype({"parish_id": "int64"}).drop_duplicates()
+    facts_in = facts.dropna(subset=["parish_id"]).astype({"parish_id": "int64"}).merge(quarters)
+    quarterly = _replace_rows(stored_quarterly, aggregate_quarterly(facts_in), ["parish_id", "quarter"], quarters)
+
+    listing_ids = pd.DataFrame({"listing_id": touched["listing_id"].unique()})
+    fresh_listings = listing_reviews(facts[facts["listing_id"].isin(listing_ids["listing_id"])])
+    old_parishes = (
+        stored_listings[stored_listings["listing_id"].isin(listing_ids["listing_id"])]["parish_id"]
+        if stored_listings is not None else pd.Series(dtype="Int64")
+    )
+    listings = _replace_rows(stored_listings, fresh_listings, ["listing_id"], listing_ids)
+
+    parish_ids = pd.concat([old_parishes, fresh_listings["parish_id"]]).dropna().astype("int64").unique()
+    parish_ids = pd.DataFrame({"parish_id": parish_ids})
+    in_parishes = listings[listings["parish_id"].isin(parish_ids["parish_id"])]
+    parishes = _replace_rows(stored_parishes, parish_languages(in_parishes), ["parish_id"], parish_ids)
+
+    quarterly.to_csv(quarterly_path, index=False)
+    parishes.to_csv(parish_path, index=False)
+    write_cache(listings, "listing_reviews", listings_path)
+    # facts last: if anything above fails, the next run diffs against the old state again
+    write_cache(facts, "review_facts", facts_path)
+    # after the facts, so a failure in between only costs a full price lookup
+    with open(sources_path, "w") as fp:
+        json.dump({"calendar": calendar_digest}, fp)
+    return {
+        "price_lookups": len(facts) if prices is None else int(np.isnan(prices).sum()),
+        "changed_reviews": len(touched["id"].unique()),
+        "parish_quarters": len(quarters),
+        "listings": len(listing_ids),
+        "parishes": len(parish_ids),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the review aggregates for a new snapshot")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    counts = ingest(args.data_dir)
+    print(
+        f"{counts['changed_reviews']} new/changed/removed reviews; looked up {counts['price_lookups']} prices, "
+        f"recomputed {counts['parish_quarters']} parish-quarters, {counts['listings']} listings and "
+        f"{counts['parishes']} parishes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Parish x quarter x language counts for answering quarter selections without pandas."""
+import numpy as np
+import pandas as pd
+
+from pipeline.reducers import counts_to_modes
+
+
+class LanguageCube:
+    """Dense count array over (parish, quarter, language), built once at startup.
+
+    A selection of quarters is answered by summing the selected quarter
+    slices and taking the argmax over languages, which is a few microseconds
+    of NumPy instead of a filter, a groupby and two merges.
+
+    Args:
+        quarterly (pandas.DataFrame): Rows of ``parish_data_quarterly.csv``
+            (``parish_id``, ``quarter``, ``language``).
+        parish_ids (sequence, optional): Parish order of the first axis, e.g.
+            the ``parish_id`` column of the frame the map is drawn from, so
+            results line up with its rows. Defaults to the sorted ids found
+            in ``quarterly``.
+        weights (str, optional): Column to count instead of rows, e.g.
+            ``num_reviews``. By default every (parish, quarter) row counts
+            once, matching the mode of the quarterly languages.
+    """
+
+    def __init__(self, quarterly, parish_ids=None, weights=None):
+        quarterly = quarterly.dropna(subset=["language"])
+        if parish_ids is None:
+            parish_ids = np.sort(quarterly["parish_id"].unique())
+        self.parish_ids = pd.Index(parish_ids)
+        self.quarters = pd.Index(np.sort(quarterly["quarter"].unique()))
+        self.languages = pd.Index(np.sort(quarterly["language"].unique()))
+
+        parish_idx = self.parish_ids.get_indexer(quarterly["parish_id"])
+        known = parish_idx >= 0
+        quarterly = quarterly[known]
+        quarter_idx = self.quarters.get_indexer(quarterly["quarter"])
+        language_idx = self.languages.get_indexer(quarterly["language"])
+
+        shape = (len(self.parish_ids), len(self.quarters), len(self.languages))
+        flat = np.ravel_multi_index((parish_idx[known], quarter_idx, language_idx), shape)
+        self.counts = np.bincount(
+            flat,
+            weights=None if weights is None else quarterly[weights].to_numpy(dtype=float),
+            minlength=int(np.prod(shape)),
+        ).reshape(shape)
+
+    def totals(self, quarters=None):
+        """(parish x language) counts summed over ``quarters`` (all quarters if None)."""
+        if quarters is None:
+            return self.counts.sum(axis=1)
+        idx = self.quarters.get_indexer(list(quarters))
+        return self.counts[:, idx[idx >= 0], :].sum(axis=1)
+
+    def modes(self, quarters=None):
+        """Dominant language, its share and the runner-up per parish for ``quarters``.
+
+        Parishes without any rows in the selection get ``None``.
+        """
+        modes = counts_to_modes(self.totals(quarters), self.languages, self.parish_ids)
+        modes.index.name = "parish_id"
+        return modes
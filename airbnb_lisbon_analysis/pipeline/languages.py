@@ -0,0 +1,52 @@
+"""Review languages per listing and per parish."""
+import numpy as np
+import pandas as pd
+
+from pipeline.reducers import counts_to_modes, mode_by
+
+
+def listing_languages(reviews, review_languages):
+    """Dominant review language of every listing, with the full distribution.
+
+    Reviews are joined to their language once and counted into a
+    (listing x language) matrix with a single ``bincount``, instead of
+    filtering the reviews of each listing separately.
+
+    Args:
+        reviews (pandas.DataFrame): ``id`` and ``listing_id``.
+        review_languages (pandas.DataFrame): ``id`` and ``language``.
+
+    Returns:
+        tuple: ``(summary, distribution)``. ``summary`` is indexed by
+        ``listing_id`` with ``language`` (ties go to the language that sorts
+        first), ``count`` (reviews in that language), ``num_reviews``
+        (reviews with a known language) and ``share``. ``distribution`` has
+        the review count of every language (columns) per listing (rows).
+        Listings without a review of known language are left out of both.
+    """
+    df = reviews[["id", "listing_id"]].merge(
+        review_languages[["id", "language"]].drop_duplicates("id").dropna(subset=["language"]), on="id"
+    )
+    listing_codes, listing_ids = pd.factorize(df["listing_id"], sort=True)
+    language_codes, languages = pd.factorize(df["language"], sort=True)
+
+    n_languages = len(languages)
+    counts = np.bincount(
+        listing_codes * n_languages + language_codes, minlength=len(listing_ids) * n_languages
+    ).reshape(len(listing_ids), n_languages)
+    index = pd.Index(listing_ids, name="listing_id")
+    distribution = pd.DataFrame(counts, index=index, columns=pd.Index(languages, name="language"))
+
+    modes = counts_to_modes(counts, languages, index)
+    summary = pd.DataFrame({
+        "language": modes["language"],
+        "count": counts.max(axis=1),
+        "num_reviews": counts.sum(axis=1),
+        "share": modes["share"],
+    }, index=index)
+    return summary, distribution
+
+
+def parish_languages(listings):
+    """Most frequent listing language per parish (``parish_id``, ``language``), as in ``parish_data.csv``."""
+    return mode_by(listings.dropna(subset=["parish_id"]), "parish_id")[["language"]].reset_index()
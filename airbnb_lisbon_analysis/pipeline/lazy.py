@@ -0,0 +1,90 @@
+"""Datasets and figures built on first use instead of at import."""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "AIRBNB_WARM_UP"
+
+
+def warm_up_enabled():
+    return os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+class LazyRegistry:
+    """Named values whose builders run once, on first access.
+
+    Register a builder with ``@registry.register(name)`` and read the value
+    with ``registry[name]``. Concurrent first accesses from several request
+    threads wait for a single build; a builder that raises is retried on the
+    next access. Builders may read other entries of the registry, as long
+    as they do not depend on themselves.
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._locks = {}
+        self._values = {}
+        self._warm_hooked = False
+
+    def register(self, name):
+        def decorator(build):
+            self._builders[name] = build
+            self._locks[name] = threading.Lock()
+            return build
+
+        return decorator
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        with self._locks[name]:
+            # another thread may have finished the build while we waited
+            if name not in self._values:
+                self._values[name] = self._builders[name]()
+            return self._values[name]
+
+    def loaded(self, name):
+        return name in self._values
+
+    def warm(self, names=None):
+        """Build ``names`` (all entries, in registration order, by default) in a background thread.
+
+        Returns the started daemon thread; requests arriving meanwhile
+        either find their entry ready or wait for the build in progress.
+        """
+
+        def run():
+            for name in names or list(self._builders):
+                try:
+                    self[name]
+                except Exception:
+                    logger.exception("warming up %s failed; it will be retried on first use", name)
+
+        thread = threading.Thread(target=run, name="lazy-registry-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def warm_on_first_request(self, server, names=None):
+        """Start ``warm`` when ``server`` (a Flask app) handles its first request.
+
+        By then the process is listening, and only a process that actually
+        serves builds anything: not the debug reloader's file watcher, nor a
+        WSGI master that imports the app before forking its workers. Hooking
+        the same registry again does nothing.
+        """
+        if self._warm_hooked:
+            return
+        self._warm_hooked = True
+        lock = threading.Lock()
+        started = []
+
+        def start():
+            with lock:
+                if not started:
+                    started.append(self.warm(names))
+
+        server.before_request(start)
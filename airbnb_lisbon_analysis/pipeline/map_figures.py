@@ -0,0 +1,96 @@
+"""Map figures whose callbacks send ``dash.Patch`` diffs instead of whole figures.
+
+The base figure (layout, map style, GeoJSON reference) is sent once when the
+tab renders; callbacks then only replace the per-point arrays that changed.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from dash import Patch
+
+LANGUAGE_HOVER = "<b>%{hovertext}</b><br><br>language=%{customdata[0]}<extra></extra>"
+
+
+def _language_color(language, color_map, i):
+    palette = px.colors.qualitative.Plotly
+    return color_map.get(language, palette[i % len(palette)])
+
+
+def _language_trace_data(locations, languages, names, all_languages):
+    locations = np.asarray(locations)
+    languages = np.asarray(languages, dtype=object)
+    names = np.asarray(names, dtype=object)
+    for language in all_languages:
+        mask = languages == language
+        yield {
+            "locations": locations[mask],
+            "z": np.ones(mask.sum()),
+            "hovertext": names[mask],
+            "customdata": languages[mask, None],
+        }
+
+
+def language_choropleth(geojson, locations, languages, names, all_languages, color_map, **map_layout):
+    """Choropleth with one fixed trace per language in ``all_languages``.
+
+    Unlike ``px.choropleth_map``, a trace exists for every language even if
+    no parish currently has it, so ``language_choropleth_patch`` can move
+    parishes between traces without changing the figure's structure.
+    Parishes whose language is missing are not drawn.
+
+    Args:
+        geojson (str or dict): Parish polygons, or a URL serving them, with
+            feature ids matching ``locations``.
+        locations (sequence): Parish id per row.
+        languages (sequence): Language per row.
+        names (sequence): Hover title per row.
+        all_languages (sequence): Every language a later patch may use.
+        color_map (dict): Colour per language; others cycle the Plotly palette.
+        **map_layout: ``center``, ``zoom`` and ``style`` of the map.
+    """
+    fig = go.Figure()
+    for i, (language, data) in enumerate(zip(all_languages, _language_trace_data(locations, languages, names, all_languages))):
+        color = _language_color(language, color_map, i)
+        fig.add_trace(go.Choroplethmap(
+            geojson=geojson,
+            featureidkey="id",
+            colorscale=[[0, color], [1, color]],
+            showscale=False,
+            name=language,
+            legendgroup=language,
+            showlegend=True,
+            hovertemplate=LANGUAGE_HOVER,
+            **data,
+        ))
+    fig.update_layout(map=map_layout, legend_title_text="language", legend_tracegroupgap=0)
+    return fig
+
+
+def language_choropleth_patch(locations, languages, names, all_languages):
+    """Patch moving every parish to the trace of its new language."""
+    patch = Patch()
+    for i, data in enumerate(_language_trace_data(locations, languages, names, all_languages)):
+        for key, value in data.items():
+            patch["data"][i][key] = value
+    return patch
+
+
+def scatter_map_patch(df, lat, lon, color, size, hover_name, hover_data, **map_layout):
+    """Patch replacing the points of a single-trace ``px.scatter_map`` figure.
+
+    The arguments mirror the ``px.scatter_map`` call that built the base
+    figure, so the marker, hover and custom data arrays keep the layout px
+    gave them. ``**map_layout`` (e.g. ``bounds``) replaces those keys of the
+    figure's ``layout.map``, the subplot ``scatter_map`` draws on.
+    """
+    patch = Patch()
+    trace = patch["data"][0]
+    trace["lat"] = df[lat].to_numpy()
+    trace["lon"] = df[lon].to_numpy()
+    trace["marker"]["color"] = df[color].to_numpy()
+    trace["marker"]["size"] = df[size].to_numpy()
+    trace["hovertext"] = df[hover_name].to_numpy()
+    trace["customdata"] = df[list(hover_data)].to_numpy()
+    for key, value in map_layout.items():
+        patch["layout"]["map"][key] = value
+    return patch
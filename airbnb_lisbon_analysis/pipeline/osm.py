@@ -0,0 +1,100 @@
+"""Boundaries and points of interest from the OpenStreetMap extract, decoded once.
+
+    python -m pipeline.osm --data-dir data
+
+Decoding ``lisbon-latest.osm.pbf`` with ``pyrosm`` takes minutes, so the
+boundaries and the POIs (with ``poi_type`` already resolved) are stored as
+GeoParquet under ``<data_dir>/.cache``, named after a hash of the PBF. Later
+loads, from any notebook kernel or process, read those files; a new extract
+gets a new hash and is decoded again on its next load.
+"""
+import argparse
+import os
+
+import geopandas as gpd
+
+from pipeline.data import DATA_DIR, cached_tables
+from pipeline.parishes import assign_parishes
+
+OSM_FILE = "lisbon-latest.osm.pbf"
+BOUNDARY_COLUMNS = ["id", "name", "admin_level", "border_type", "boundary", "geometry"]
+POI_COLUMNS = ["id", "osm_type", "name", "amenity", "shop", "tourism", "poi_type", "geometry"]
+# OSM ids of the municipalities making up the Lisbon region
+LISBON_DISTRICTS = [
+    2360639767, 2403846494, 2371441366, 2366040524, 515094978, 2409247383, 2414648273, 2376842209,
+    546980796, 2382243053, 2420049164, 2425450056, 2430850949, 2387643898, 454253144, 2393044744,
+]
+
+
+def _keep(gdf, columns):
+    return gdf[[column for column in columns if column in gdf.columns]].reset_index(drop=True)
+
+
+def extract_osm(data_dir=DATA_DIR):
+    """Decode the PBF extract once into ``(boundaries, pois)``.
+
+    POIs get a ``poi_type``: their ``amenity``, or their ``shop`` when they
+    have no amenity.
+    """
+    from pyrosm import OSM
+
+    osm = OSM(os.path.join(data_dir, OSM_FILE))
+    boundaries = osm.get_boundaries()
+    pois = osm.get_pois()
+    pois["poi_type"] = pois["amenity"].fillna(pois["shop"])
+    return _keep(boundaries, BOUNDARY_COLUMNS), _keep(pois, POI_COLUMNS)
+
+
+def _load(tables, columns, data_dir):
+    # both tables are cached whenever either is built, so they share one
+    # decoding of the PBF
+    return cached_tables(
+        ["osm_boundaries", "osm_pois"],
+        [OSM_FILE],
+        lambda: extract_osm(data_dir),
+        columns=columns,
+        data_dir=data_dir,
+        read=gpd.read_parquet,
+        load=tables,
+    )
+
+
+def load_boundaries(columns=None, data_dir=DATA_DIR):
+    """Cached administrative boundaries of the extract (GeoDataFrame)."""
+    return _load(["osm_boundaries"], columns, data_dir)["osm_boundaries"]
+
+
+def load_pois(columns=None, data_dir=DATA_DIR):
+    """Cached points of interest of the extract, with ``poi_type`` (GeoDataFrame)."""
+    return _load(["osm_pois"], columns, data_dir)["osm_pois"]
+
+
+def lisbon_parishes(boundaries, districts=LISBON_DISTRICTS):
+    """Parishes (``freguesia`` boundaries) lying within one of the ``districts``.
+
+    One spatial join against the district polygons instead of a
+    ``within`` scan of every parish per district.
+    """
+    parishes = boundaries[boundaries["border_type"] == "freguesia"]
+    district_ids = assign_parishes(parishes, boundaries[boundaries["id"].isin(districts)])
+    return parishes[district_ids.notna()]
+
+
+def parish_pois(pois, parishes):
+    """``pois`` lying within one of ``parishes``, with the ``parish_id`` they fall in."""
+    parish_ids = assign_parishes(pois, parishes)
+    return pois.assign(parish_id=parish_ids)[parish_ids.notna()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode the OSM extract into the GeoParquet cache")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    tables = _load(None, None, args.data_dir)
+    boundaries, pois = tables["osm_boundaries"], tables["osm_pois"]
+    print(f"{len(boundaries)} boundaries, {len(pois)} points of interest")
+
+
+if __name__ == "__main__":
+    main()
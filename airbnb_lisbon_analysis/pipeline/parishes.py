@@ -0,0 +1,77 @@
+"""Assignment of listings to the parish polygon they fall in."""
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from pipeline.data import DATA_DIR, DATASETS, cached_table, load_listings
+
+PARISHES_FILE = "lisbon_parishes.geojson"
+
+
+def load_parishes(data_dir=DATA_DIR):
+    return gpd.read_file(os.path.join(data_dir, PARISHES_FILE))
+
+
+def listing_points(listings, crs="EPSG:4326"):
+    """GeoDataFrame of ``listings`` with point geometries built from longitude/latitude."""
+    geometry = gpd.points_from_xy(listings["longitude"], listings["latitude"])
+    return gpd.GeoDataFrame(listings, geometry=geometry, crs=crs)
+
+
+def assign_parishes(points, parishes, id_column="id"):
+    """Id of the parish each point lies within, aligned to ``points.index``.
+
+    All points are matched in one bulk query against an STR-tree of the
+    parish polygons, instead of testing every listing against every parish.
+    Points outside all parishes get ``<NA>``, and so do points exactly on a
+    parish border, which (as with ``GeoSeries.within``) lie within neither
+    parish. A point within several overlapping parishes goes to the first
+    one in ``parishes``.
+
+    Args:
+        points (geopandas.GeoSeries or GeoDataFrame): Listing locations.
+        parishes (geopandas.GeoDataFrame): Parish polygons with an id column.
+        id_column (str): Column of ``parishes`` holding the parish id.
+    """
+    geometry = points.geometry if isinstance(points, gpd.GeoDataFrame) else points
+    if parishes.crs is not None and geometry.crs is not None and geometry.crs != parishes.crs:
+        geometry = geometry.to_crs(parishes.crs)
+
+    point_idx, parish_idx = parishes.sindex.query(geometry.values, predicate="within")
+    # keep the first parish per point; query results are not guaranteed sorted
+    order = np.lexsort((parish_idx, point_idx))
+    point_idx, parish_idx = point_idx[order], parish_idx[order]
+    first = np.r_[True, point_idx[1:] != point_idx[:-1]]
+
+    parish_ids = pd.Series(pd.NA, index=geometry.index, dtype="Int64", name="parish_id")
+    parish_ids.iloc[point_idx[first]] = parishes[id_column].to_numpy()[parish_idx[first]]
+    return parish_ids
+
+
+def build_listing_parishes(data_dir=DATA_DIR):
+    """Table of ``listing_id`` -> ``parish_id`` for the current listings snapshot."""
+    listings = load_listings(columns=["id", "longitude", "latitude"], data_dir=data_dir)
+    parish_ids = assign_parishes(listing_points(listings), load_parishes(data_dir))
+    return pd.DataFrame({"listing_id": listings["id"], "parish_id": parish_ids})
+
+
+def load_listing_parishes(data_dir=DATA_DIR):
+    """Cached ``build_listing_parishes``, rebuilt when listings or parishes change."""
+    return cached_table(
+        "listing_parishes",
+        [DATASETS["listings"]["file"], PARISHES_FILE],
+        lambda: build_listing_parishes(data_dir),
+        data_dir=data_dir,
+    )
+
+
+def load_listings_with_parish(columns=None, data_dir=DATA_DIR):
+    """Listings with a persisted ``parish_id`` column (``<NA>`` outside the parishes)."""
+    if columns is not None and "id" not in columns:
+        columns = ["id", *columns]
+    listings = load_listings(columns=columns, data_dir=data_dir)
+    parish_ids = load_listing_parishes(data_dir).set_index("listing_id")["parish_id"]
+    listings["parish_id"] = listings["id"].map(parish_ids).astype("Int64")
+    return listings
@@ -0,0 +1,74 @@
+"""Points-of-interest counts per area as sparse features for the nationality classifier."""
+import collections
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from pipeline.parishes import assign_parishes
+from pipeline.reducers import mode_by
+
+PoiFeatures = collections.namedtuple("PoiFeatures", ["X", "y", "areas", "categories", "languages"])
+
+
+def poi_count_matrix(area_ids, poi_types, areas=None):
+    """Sparse (area x POI category) count matrix.
+
+    The POIs are counted in one pass (COO entries summed on conversion to
+    CSR) instead of a ``value_counts`` per area, so areas can be as fine as
+    grid cells without the matrix ever being dense.
+
+    Args:
+        area_ids (array-like): Area of every POI; missing where the POI lies
+            outside all areas.
+        poi_types (array-like): Category of every POI. Missing categories
+            are not counted.
+        areas (array-like, optional): Areas giving the rows, in order.
+            Defaults to the sorted distinct ``area_ids``; POIs of other areas
+            are left out.
+
+    Returns:
+        tuple: ``(matrix, areas, categories)``; ``matrix`` is a
+        ``scipy.sparse.csr_matrix`` and ``categories`` (sorted, every
+        category of ``poi_types``) labels its columns.
+    """
+    area_ids = pd.Index(area_ids)
+    category_codes, categories = pd.factorize(np.asarray(poi_types, dtype=object), sort=True)
+    areas = area_ids.dropna().unique().sort_values() if areas is None else pd.Index(areas)
+
+    rows = areas.get_indexer(area_ids)
+    counted = (rows >= 0) & (category_codes >= 0)
+    matrix = sparse.coo_matrix(
+        (np.ones(counted.sum(), dtype=np.int32), (rows[counted], category_codes[counted])),
+        shape=(len(areas), len(categories)),
+    ).tocsr()
+    return matrix, areas, pd.Index(categories)
+
+
+def parish_poi_features(pois, parishes, language_data, id_column="id"):
+    """POI counts and most common review language of every parish that has one.
+
+    Args:
+        pois (geopandas.GeoDataFrame): Points of interest with ``poi_type``.
+        parishes (geopandas.GeoDataFrame): Parish polygons with an id column.
+        language_data (pandas.DataFrame): Rows with ``parish_id`` and
+            ``language`` (e.g. ``parish_data_quarterly.csv``); the label of
+            a parish is its most frequent ``language``, ties going to the
+            value that sorts first.
+        id_column (str): Column of ``parishes`` holding the parish id.
+
+    Returns:
+        PoiFeatures: ``X`` (sparse parish x category counts), ``y`` (index
+        of each parish's language in ``languages``), the ``areas`` (parish
+        ids, in ``parishes`` order) and the ``categories`` labelling the
+        columns. Parishes without any language are left out.
+    """
+    # one STR-tree join assigns every POI to its parish
+    area_ids = assign_parishes(pois, parishes, id_column)
+    modes = mode_by(language_data, "parish_id")["language"]
+
+    areas = parishes[id_column][parishes[id_column].isin(modes.index)].to_numpy()
+    X, areas, categories = poi_count_matrix(area_ids, pois["poi_type"], areas)
+    languages = pd.Index(language_data["language"].dropna().unique())
+    y = languages.get_indexer(modes.loc[areas])
+    return PoiFeatures(X, y, areas, categories, languages)
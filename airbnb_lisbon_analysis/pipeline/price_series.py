@@ -0,0 +1,173 @@
+"""Calendar prices aggregated per day, week, month and quarter, for the city, each parish and each room type.
+
+    python -m pipeline.price_series --data-dir data
+
+The calendar is streamed once. Every priced row is counted into a price
+histogram (bins 2% wide) of its day for the whole city, for its listing's
+parish and for its room type; the days are then rolled up into weeks,
+months and quarters. Means and counts are exact, percentiles are read off
+the histograms (to within a bin width). The result is one small
+table, cached until the calendar, the listings or the parishes change, so
+a chart of price trends never touches the calendar itself.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data import CHUNK_SIZE, DATA_DIR, DATASETS, cached_table, iter_source, load_listings
+from pipeline.parishes import PARISHES_FILE, load_listing_parishes
+
+RESOLUTIONS = {"day": "D", "week": "W", "month": "M", "quarter": "Q"}
+LEVELS = ["city", "parish", "room_type"]
+CITY = "all"
+PERCENTILES = [10, 25, 50, 75, 90]
+COLUMNS = ["resolution", "level", "key", "date", "avg_price", "days"] + [f"p{p}" for p in PERCENTILES]
+SOURCES = [DATASETS["calendar"]["file"], DATASETS["listings"]["file"], PARISHES_FILE]
+
+# prices are binned on a log scale: bin b holds [1.02**b, 1.02**(b + 1))
+BIN_WIDTH = np.log(1.02)
+MAX_PRICE = 100_000
+# (series, day, bin) packed into one int64 key
+DAY_BITS, BIN_BITS = 20, 10
+
+
+def _listing_series(data_dir):
+    """Series labels and, per listing, its parish and room type series codes (-1 for none)."""
+    listings = load_listings(columns=["id", "room_type"], data_dir=data_dir)
+    parishes = load_listing_parishes(data_dir).drop_duplicates("listing_id").set_index("listing_id")["parish_id"]
+    parish_ids = parishes.reindex(listings["id"]).to_numpy()
+
+    parish_codes, parish_keys = pd.factorize(pd.Series(parish_ids, dtype="Int64"), sort=True)
+    room_codes, room_keys = pd.factorize(listings["room_type"], sort=True)
+    labels = pd.DataFrame({
+        "level": ["city"] + ["parish"] * len(parish_keys) + ["room_type"] * len(room_keys),
+        "key": [CITY] + [str(key) for key in parish_keys] + [str(key) for key in room_keys],
+    })
+    parish_series = np.where(parish_codes >= 0, 1 + parish_codes, -1)
+    room_series = np.where(room_codes >= 0, 1 + len(parish_keys) + room_codes, -1)
+    return labels, pd.Index(listings["id"]), parish_series, room_series
+
+
+def _add(totals, partial):
+    if totals is None:
+        return partial
+    return pd.concat([totals, partial]).groupby(level=0).sum()
+
+
+def daily_histograms(data_dir=DATA_DIR, chunksize=CHUNK_SIZE):
+    """Per (series, day, price bin) counts and price totals of the calendar, in one streaming pass.
+
+    Returns:
+        tuple: ``(labels, histograms)``; ``labels`` has the ``level`` and
+        ``key`` of every series code, ``histograms`` has ``series``,
+        ``day`` (days since 1970), ``bin``, ``count`` and ``total``.
+    """
+    labels, listing_index, parish_series, room_series = _listing_series(data_dir)
+    totals = None
+    for chunk in iter_source("calendar", data_dir, ["listing_id", "date", "price"], chunksize):
+        price = chunk["price"].to_numpy(dtype="float64")
+        priced = np.isfinite(price) & (price > 0)
+        price = price[priced]
+        days = chunk["date"].to_numpy(dtype="datetime64[D]")[priced].astype(np.int64)
+        bins = np.floor(np.log(np.clip(price, 1, MAX_PRICE)) / BIN_WIDTH).astype(np.int64)
+        positions = listing_index.get_indexer(chunk["listing_id"].to_numpy()[priced])
+
+        # every row counts for the city and, when known, its parish and room type
+        series = [np.zeros(len(price), dtype=np.int64)]
+        for codes in (parish_series, room_series):
+            series.append(np.where(positions >= 0, codes[positions], -1))
+        series = np.concatenate(series)
+        keep = series >= 0
+        keys = (series[keep] << (DAY_BITS + BIN_BITS)) | (np.tile(days, 3)[keep] << BIN_BITS) | np.tile(bins, 3)[keep]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        partial = pd.DataFrame({
+            "count": np.bincount(inverse, minlength=len(unique)),
+            "total": np.bincount(inverse, weights=np.tile(price, 3)[keep], minlength=len(unique)),
+        }, index=unique)
+        totals = _add(totals, partial)
+
+    keys = totals.index.to_numpy()
+    histograms = pd.DataFrame({
+        "series": keys >> (DAY_BITS + BIN_BITS),
+        "day": (keys >> BIN_BITS) & ((1 << DAY_BITS) - 1),
+        "bin": keys & ((1 << BIN_BITS) - 1),
+        "count": totals["count"].to_numpy(dtype=np.int64),
+        "total": totals["total"].to_numpy(),
+    })
+    return labels, histograms
+
+
+def _percentiles(grouped):
+    """Percentiles per group of a frame sorted by (group, bin) with a ``group`` and ``count`` column."""
+    cumulative = grouped["count"].cumsum().to_numpy()
+    group_totals = grouped.groupby("group", sort=False)["count"].sum()
+    ends = np.cumsum(group_totals.to_numpy())
+    starts = ends - group_totals.to_numpy()
+    bins = grouped["bin"].to_numpy()
+    result = {}
+    for p in PERCENTILES:
+        # first bin whose running count reaches p% of the group's count
+        positions = np.searchsorted(cumulative, starts + np.ceil(group_totals.to_numpy() * p / 100), side="left")
+        result[f"p{p}"] = np.exp((bins[positions] + 0.5) * BIN_WIDTH).astype("float32")
+    return pd.DataFrame(result, index=group_totals.index)
+
+
+def roll_up(labels, histograms):
+    """``COLUMNS`` table of every resolution from ``daily_histograms``."""
+    days, day_rows = np.unique(histograms["day"].to_numpy(), return_inverse=True)
+    dates = pd.Series(pd.to_datetime(days, unit="D"))
+    tables = []
+    for resolution, freq in RESOLUTIONS.items():
+        # periods labelled by their last day, as ``resample(freq)`` does
+        period_ends = dates.dt.to_period(freq).dt.end_time.dt.normalize().to_numpy()
+        binned = (
+            histograms.assign(date=period_ends[day_rows])
+            .groupby(["series", "date", "bin"], sort=True)[["count", "total"]].sum()
+            .reset_index()
+        )
+        binned["group"] = binned.groupby(["series", "date"]).ngroup()
+        per_group = binned.groupby("group", sort=False).agg(
+            series=("series", "first"), date=("date", "first"), days=("count", "sum"), total=("total", "sum")
+        )
+        table = per_group.join(_percentiles(binned))
+        table["avg_price"] = table["total"] / table["days"]
+        table["resolution"] = resolution
+        table["level"] = labels["level"].to_numpy()[table["series"]]
+        table["key"] = labels["key"].to_numpy()[table["series"]]
+        tables.append(table[COLUMNS])
+    return pd.concat(tables, ignore_index=True)
+
+
+def price_series(data_dir=DATA_DIR, chunksize=CHUNK_SIZE):
+    """Mean, count and percentiles of calendar prices at every resolution and level.
+
+    Returns:
+        pandas.DataFrame: ``COLUMNS``; ``resolution`` is one of
+        ``RESOLUTIONS``, ``level`` one of ``LEVELS`` and ``key`` the parish
+        id or room type (``CITY`` for the city), ``date`` the last day of
+        the period and ``days`` the number of priced listing-days in it.
+    """
+    return roll_up(*daily_histograms(data_dir, chunksize))
+
+
+def load_price_series(resolution=None, level=None, data_dir=DATA_DIR):
+    """Cached ``price_series``, optionally only one ``resolution`` and/or ``level``."""
+    table = cached_table("price_series", SOURCES, lambda: price_series(data_dir), data_dir=data_dir)
+    if resolution is not None:
+        table = table[table["resolution"] == resolution]
+    if level is not None:
+        table = table[table["level"] == level]
+    return table.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the price time-series table")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+    table = load_price_series(data_dir=args.data_dir)
+    print(f"{len(table)} rows, {table['date'].min():%Y-%m-%d} to {table['date'].max():%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Per parish and quarter review aggregates (``parish_data_quarterly.csv``).
+
+    python -m pipeline.quarterly --data-dir data
+"""
+import argparse
+import os
+
+import numpy as np
+
+from pipeline.data import DATA_DIR, iter_dataset, load_review_languages, load_reviews
+from pipeline.day_prices import day_prices
+from pipeline.parishes import load_listing_parishes
+from pipeline.reducers import mode_by
+
+QUARTERLY_FILE = "parish_data_quarterly.csv"
+COLUMNS = ["parish_id", "quarter", "num_reviews", "language", "avg_price"]
+
+
+def review_facts(reviews, review_languages, calendar, listing_parishes, known_prices=None):
+    """One row per review with everything the review aggregates are built from.
+
+    Each review is joined once to its parish, its language and the calendar
+    price of its listing on the review date (0 when the calendar has no
+    price for that day).
+
+    Args:
+        reviews (pandas.DataFrame): ``id``, ``listing_id`` and ``date``.
+        review_languages (pandas.DataFrame): ``id`` and ``language``.
+        calendar (pandas.DataFrame or iterable): ``listing_id``, ``date``
+            and numeric ``price``, as one frame or in chunks (see
+            ``pipeline.day_prices.day_prices``).
+        listing_parishes (pandas.DataFrame): ``listing_id`` and ``parish_id``.
+        known_prices (array-like, optional): Price of every review where it
+            is already known (e.g. from an earlier run), NaN elsewhere; the
+            calendar is only searched for the NaN ones, and not read at all
+            when there are none.
+
+    Returns:
+        pandas.DataFrame: ``id``, ``listing_id``, ``date``, ``parish_id``
+        (``<NA>`` outside the parishes), ``language``, ``price`` and
+        ``quarter`` (as a string, e.g. ``"2023Q4"``).
+    """
+    df = reviews[["id", "listing_id", "date"]].merge(
+        listing_parishes[["listing_id", "parish_id"]].drop_duplicates("listing_id"), on="listing_id", how="left"
+    )
+    if known_prices is None:
+        price = np.full(len(df), np.nan, dtype=np.float32)
+    else:
+        price = np.array(known_prices, dtype=np.float32)
+    missing = np.isnan(price)
+    if missing.any():
+        # a packed (listing, day) key lookup, not a merge with the calendar
+        price[missing] = day_prices(df["listing_id"].to_numpy()[missing], df["date"].to_numpy()[missing], calendar)
+    df["price"] = price
+    df["price"] = df["price"].fillna(0)
+    df = df.merge(review_languages[["id", "language"]].drop_duplicates("id"), on="id", how="left")
+    df["quarter"] = df["date"].dt.to_period("Q").astype(str)
+    return df
+
+
+def aggregate_quarterly(facts):
+    """Reduce ``review_facts`` rows to one row per (parish, quarter) with ``COLUMNS``."""
+    df = facts.dropna(subset=["parish_id"])
+    keys = ["parish_id", "quarter"]
+    result = df.groupby(keys).agg(num_reviews=("id", "size"), avg_price=("price", "mean"))
+    result["language"] = mode_by(df, keys)["language"]
+    return result.reset_index()[COLUMNS]
+
+
+def parish_quarterly(reviews, review_languages, calendar, listing_parishes):
+    """Aggregate reviews per (parish, quarter) in a single grouped pass.
+
+    Args:
+        reviews, review_languages, calendar, listing_parishes: As for
+            ``review_facts``.
+
+    Returns:
+        pandas.DataFrame: One row per (parish, quarter) with reviews, with
+        the ``COLUMNS`` of ``parish_data_quarterly.csv``.
+    """
+    return aggregate_quarterly(review_facts(reviews, review_languages, calendar, listing_parishes))
+
+
+def build_parish_quarterly(data_dir=DATA_DIR):
+    return parish_quarterly(
+        load_reviews(columns=["id", "listing_id", "date"], data_dir=data_dir),
+        load_review_languages(data_dir=data_dir),
+        # streamed: only the prices on review days are kept
+        iter_dataset("calendar", data_dir, ["listing_id", "date", "price"]),
+        load_listing_parishes(data_dir),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build parish_data_quarterly.csv")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    path = os.path.join(args.data_dir, QUARTERLY_FILE)
+    result = build_parish_quarterly(args.data_dir)
+    result.to_csv(path, index=False)
+    print(f"wrote {len(result)} rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
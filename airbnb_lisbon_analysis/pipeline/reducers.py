@@ -0,0 +1,74 @@
+"""Grouped reductions that pandas only offers through per-group Python callbacks."""
+import numpy as np
+import pandas as pd
+
+
+def mode_by(df, by, column="language", weights=None):
+    """Most frequent value of ``column`` per group, with its share and the runner-up.
+
+    Replaces ``df.groupby(by).agg(x=(column, lambda x: x.mode()[0]))``: the
+    values are factorized once, counted into a (group x value) matrix with
+    a single ``bincount`` and reduced with ``argmax``. Ties go to the value
+    that sorts first, as with ``Series.mode``.
+
+    Args:
+        df (pandas.DataFrame): Rows to reduce.
+        by (str or list): Grouping column(s).
+        column (str): Column whose mode is taken.
+        weights (str, optional): Column with a weight per row (e.g.
+            ``num_reviews``) instead of counting every row once.
+
+    Rows with a missing group key, value or weight are ignored.
+
+    Returns:
+        pandas.DataFrame: Indexed by the group keys, with ``column`` (the
+        mode), ``share`` (its fraction of the group's total) and
+        ``runner_up`` (second most frequent value, ``None`` if there is none).
+        Groups without any counted value (no rows left, or only zero
+        weights) are left out.
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    # a missing key would get no group code and break the bincount below
+    df = df.dropna(subset=[*keys, column] + ([] if weights is None else [weights]))
+    grouped = df.groupby(by, sort=True)
+    index = grouped.size().index
+    if df.empty:
+        return pd.DataFrame({column: [], "share": [], "runner_up": []}, index=index)
+
+    group_codes = grouped.ngroup().to_numpy()
+    value_codes, values = pd.factorize(df[column], sort=True)
+
+    n_values = len(values)
+    counts = np.bincount(
+        group_codes * n_values + value_codes,
+        weights=None if weights is None else df[weights].to_numpy(dtype=float),
+        minlength=len(index) * n_values,
+    ).reshape(len(index), n_values)
+    modes = counts_to_modes(counts, values, index, column)
+    return modes[counts.sum(axis=1) > 0]
+
+
+def counts_to_modes(counts, values, index=None, column="language"):
+    """Reduce a (group x value) count matrix to ``mode_by``'s result frame."""
+    counts = np.asarray(counts, dtype=float)
+    values = np.asarray(values, dtype=object)
+    rows = np.arange(len(counts))
+    totals = counts.sum(axis=1)
+
+    top = counts.argmax(axis=1)
+    top_counts = counts[rows, top]
+    rest = counts.copy()
+    rest[rows, top] = -1
+    second = rest.argmax(axis=1)
+    has_second = rest[rows, second] > 0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = top_counts / totals
+    return pd.DataFrame(
+        {
+            column: np.where(totals > 0, values[top], None),
+            "share": share,
+            "runner_up": np.where(has_second, values[second], None),
+        },
+        index=index,
+    )
@@ -0,0 +1,78 @@
+"""Compact per-listing review tables, so the dashboards never load the reviews themselves.
+
+    python -m pipeline.review_summary --data-dir data
+
+Both tables are derived from ``reviews.csv.gz`` in one streaming pass over
+its ``listing_id`` and ``date`` columns and cached until the file changes;
+running the command after a new snapshot builds them ahead of the first
+dashboard start.
+"""
+import argparse
+
+import pandas as pd
+
+from pipeline.data import CHUNK_SIZE, DATA_DIR, DATASETS, cached_tables, iter_source
+
+
+def review_summary(data_dir=DATA_DIR, chunksize=CHUNK_SIZE):
+    """Per-listing review totals and per-quarter counts.
+
+    Returns:
+        tuple: ``(summary, quarters)``. ``summary`` has ``listing_id``,
+        ``review_count``, ``first_review`` and ``last_review``;
+        ``quarters`` has ``listing_id``, ``quarter`` (e.g. ``"2023Q4"``)
+        and ``num_reviews``.
+    """
+    summaries, quarters = [], []
+    for chunk in iter_source("reviews", data_dir, ["listing_id", "date"], chunksize):
+        summaries.append(chunk.groupby("listing_id")["date"].agg(["size", "min", "max"]))
+        quarters.append(chunk.groupby(["listing_id", chunk["date"].dt.to_period("Q")]).size())
+
+    # a listing's reviews can span chunks; combine the partial results
+    grouped = pd.concat(summaries).groupby(level=0)
+    summary = pd.DataFrame({
+        "review_count": grouped["size"].sum().astype("int32"),
+        "first_review": grouped["min"].min(),
+        "last_review": grouped["max"].max(),
+    }).rename_axis("listing_id").reset_index()
+
+    quarters = pd.concat(quarters).groupby(level=[0, 1]).sum().astype("int32")
+    quarters = quarters.rename("num_reviews").rename_axis(["listing_id", "quarter"]).reset_index()
+    quarters["quarter"] = quarters["quarter"].astype(str)
+    return summary, quarters
+
+
+def _load(tables, columns, data_dir):
+    # both tables are cached whenever either is built, so they share one pass
+    return cached_tables(
+        ["review_summary", "review_quarters"],
+        [DATASETS["reviews"]["file"]],
+        lambda: review_summary(data_dir),
+        columns=columns,
+        data_dir=data_dir,
+        load=tables,
+    )
+
+
+def load_review_summary(columns=None, data_dir=DATA_DIR):
+    """Cached ``summary`` table of ``review_summary``."""
+    return _load(["review_summary"], columns, data_dir)["review_summary"]
+
+
+def load_review_quarters(columns=None, data_dir=DATA_DIR):
+    """Cached ``quarters`` table of ``review_summary``."""
+    return _load(["review_quarters"], columns, data_dir)["review_quarters"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-listing review summary tables")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    tables = _load(None, None, args.data_dir)
+    summary, quarters = tables["review_summary"], tables["review_quarters"]
+    print(f"{len(summary)} listings, {len(quarters)} listing-quarters")
+
+
+if __name__ == "__main__":
+    main()
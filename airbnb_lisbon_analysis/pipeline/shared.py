@@ -0,0 +1,88 @@
+"""Preprocessed dashboard frames shared read-only between worker processes.
+
+With ``AIRBNB_SHARED_DATA=1`` in the environment, ``shared_frame`` writes
+the frame once as an uncompressed Arrow IPC file under
+``<data_dir>/.cache/shared`` and every worker memory-maps that file instead
+of building its own copy. Numeric and datetime columns come back as
+zero-copy NumPy views of the mapping, and string columns stay in Arrow
+buffers, so the operating system keeps one copy in the page cache however
+many workers map it. Without the variable the frame is simply built in the
+process, as before.
+"""
+import glob
+import os
+
+from pipeline.data import CACHE_DIR, CACHE_VERSION, DATA_DIR, sources_digest
+
+SHARED_DIR = "shared"
+ENV_VAR = "AIRBNB_SHARED_DATA"
+
+
+def enabled():
+    return os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+def _to_arrow(df):
+    import pyarrow as pa
+
+    columns = {}
+    for name, values in df.items():
+        if values.dtype.kind in "biufM":
+            # keep NaN as a value rather than a null, so reading the column
+            # back needs no validity mask and stays a view of the file
+            columns[name] = pa.array(values.to_numpy())
+        else:
+            columns[name] = pa.array(values, from_pandas=True)
+    return pa.table(columns)
+
+
+def write_shared(df, path):
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = _to_arrow(df.reset_index(drop=True))
+    # several workers may build at the same time; each writes a private
+    # file and the last rename wins with identical contents
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def map_shared(path):
+    """Read-only DataFrame backed by the memory-mapped Arrow file at ``path``."""
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def shared_frame(name, sources, build, data_dir=DATA_DIR):
+    """``build()``, shared between processes through a memory-mapped file when ``enabled()``.
+
+    Args:
+        name (str): Name of the frame, used for the file name.
+        sources (list): File names inside ``data_dir`` the frame is built
+            from; a new snapshot of any of them gives a new file.
+        build (callable): Called without arguments to compute the frame.
+            Its index is dropped.
+        data_dir (str): Directory holding the source files.
+
+    The returned frame's arrays are read-only when shared, so callers must
+    treat it as immutable (derive new frames instead of assigning into it).
+    """
+    if not enabled():
+        return build()
+
+    directory = os.path.join(data_dir, CACHE_DIR, SHARED_DIR)
+    path = os.path.join(directory, f"{name}-v{CACHE_VERSION}-{sources_digest(sources, data_dir)}.arrow")
+    if not os.path.exists(path):
+        write_shared(build(), path)
+        for stale in glob.glob(os.path.join(directory, f"{name}-*.arrow")):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    # still mapped by a running worker on Windows
+                    pass
+    return map_shared(path)
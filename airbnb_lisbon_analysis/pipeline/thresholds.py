@@ -0,0 +1,63 @@
+"""Rows at or above a threshold without scanning the whole frame."""
+import numpy as np
+
+
+class ThresholdIndex:
+    """``df`` sorted by ``column`` with suffix min/max of the coordinates.
+
+    ``at_least(t)`` is a binary search plus a slice of the sorted frame
+    instead of a boolean scan and copy, and ``bounds(t)`` reads the bounding
+    box of those rows from precomputed suffix arrays in O(1).
+
+    Args:
+        df (pandas.DataFrame): Rows to filter; not copied if already
+            sorted by ``column``.
+        column (str): Numeric column the threshold applies to.
+        lat (str): Latitude column.
+        lon (str): Longitude column.
+    """
+
+    def __init__(self, df, column, lat="latitude", lon="longitude"):
+        values = df[column].to_numpy()
+        if np.all(values[:-1] <= values[1:]):
+            # already sorted (e.g. a shared read-only frame): use it as is
+            self.df = df.reset_index(drop=True)
+        else:
+            self.df = df.iloc[np.argsort(values, kind="stable")].reset_index(drop=True)
+        self.values = self.df[column].to_numpy()
+
+        # suffix[i] covers rows i..end; fmin/fmax skip missing coordinates
+        self._suffix = {}
+        for name in (lat, lon):
+            reversed_values = self.df[name].to_numpy(dtype=float)[::-1]
+            self._suffix[name] = (
+                np.fmin.accumulate(reversed_values)[::-1],
+                np.fmax.accumulate(reversed_values)[::-1],
+            )
+        self.lat = lat
+        self.lon = lon
+
+    def start(self, threshold):
+        """Position of the first row with ``column >= threshold``."""
+        return int(np.searchsorted(self.values, threshold, side="left"))
+
+    def at_least(self, threshold):
+        """Rows with ``column >= threshold``, as a slice of the sorted frame."""
+        return self.df.iloc[self.start(threshold):]
+
+    def bounds(self, threshold, margin=0.0):
+        """``west``/``east``/``south``/``north`` of the rows at or above ``threshold``.
+
+        Returns None when no row passes the threshold.
+        """
+        i = self.start(threshold)
+        if i >= len(self.values):
+            return None
+        lat_min, lat_max = (values[i] for values in self._suffix[self.lat])
+        lon_min, lon_max = (values[i] for values in self._suffix[self.lon])
+        return {
+            "west": lon_min - margin,
+            "east": lon_max + margin,
+            "south": lat_min - margin,
+            "north": lat_max + margin,
+        }
@@ -0,0 +1,94 @@
+"""Viewport queries for the map dashboards: which listings are on screen."""
+import numpy as np
+
+# about 1 km at Lisbon's latitude
+GRID_CELL_DEGREES = 0.01
+
+
+def viewport_from_relayout(relayout_data):
+    """``(west, east, south, north)`` visible in a map graph, from its ``relayoutData``.
+
+    Plotly reports the corner coordinates of the visible map under
+    ``map._derived`` after every pan or zoom. Returns None before the first
+    interaction.
+    """
+    for key in ("map._derived", "mapbox._derived"):
+        if relayout_data and key in relayout_data:
+            corners = np.asarray(relayout_data[key]["coordinates"], dtype=float)
+            return tuple(float(v) for v in (corners[:, 0].min(), corners[:, 0].max(),
+                                            corners[:, 1].min(), corners[:, 1].max()))
+    return None
+
+
+def pad_viewport(viewport, fraction=0.5):
+    """Grow ``viewport`` by ``fraction`` of its width/height on every side."""
+    west, east, south, north = viewport
+    dx, dy = (east - west) * fraction, (north - south) * fraction
+    return (west - dx, east + dx, south - dy, north + dy)
+
+
+def contains(outer, inner):
+    """Whether viewport ``inner`` lies completely inside ``outer``."""
+    return outer[0] <= inner[0] and inner[1] <= outer[1] and outer[2] <= inner[2] and inner[3] <= outer[3]
+
+
+class GridIndex:
+    """Uniform lat/lon grid over a set of points for bounding-box queries.
+
+    Points are sorted by grid cell once; a query visits only the cells
+    overlapping the box and tests the points in them, instead of comparing
+    every point's coordinates. Only occupied cells are stored, as a sorted
+    array of cell ids, so an outlier or a second city far away costs
+    nothing for the empty cells in between.
+
+    Args:
+        lat (array-like): Latitudes.
+        lon (array-like): Longitudes.
+        cell (float): Grid cell size in degrees.
+    """
+
+    def __init__(self, lat, lon, cell=GRID_CELL_DEGREES):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.cell = cell
+        self.west = np.nanmin(self.lon)
+        self.south = np.nanmin(self.lat)
+        self.columns = int((np.nanmax(self.lon) - self.west) // cell) + 1
+        self.rows = int((np.nanmax(self.lat) - self.south) // cell) + 1
+
+        valid = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        cells = self._cell_ids(self.lon[valid], self.lat[valid])
+        order = np.argsort(cells, kind="stable")
+        self.order = np.flatnonzero(valid)[order]
+        # offsets[i]:offsets[i + 1] are the positions in self.order of the
+        # points in cell self.cells[i]
+        self.cells, starts = np.unique(cells[order], return_index=True)
+        self.offsets = np.append(starts, len(self.order))
+
+    def _cell_ids(self, lon, lat):
+        ix = ((lon - self.west) // self.cell).astype(np.int64)
+        iy = ((lat - self.south) // self.cell).astype(np.int64)
+        return iy * self.columns + ix
+
+    def query(self, west, east, south, north):
+        """Positions (into the arrays the index was built from) of points inside the box."""
+        ix0 = max(int((west - self.west) // self.cell), 0)
+        ix1 = min(int((east - self.west) // self.cell), self.columns - 1)
+        iy0 = max(int((south - self.south) // self.cell), 0)
+        iy1 = min(int((north - self.south) // self.cell), self.rows - 1)
+        if ix0 > ix1 or iy0 > iy1:
+            return np.empty(0, dtype=np.int64)
+
+        # the occupied cells of each grid row of the box are one contiguous
+        # run of self.cells, found with two binary searches per row
+        row_ids = np.arange(iy0, iy1 + 1, dtype=np.int64) * self.columns
+        first = np.searchsorted(self.cells, row_ids + ix0, side="left")
+        last = np.searchsorted(self.cells, row_ids + ix1, side="right")
+        occupied = last > first
+        runs = [self.order[self.offsets[i]:self.offsets[j]] for i, j in zip(first[occupied], last[occupied])]
+        if not runs:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(runs)
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        return np.sort(candidates[inside])
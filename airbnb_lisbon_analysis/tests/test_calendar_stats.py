@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.calendar_stats import RunningStats, calendar_stats
+
+
+def test_running_stats_over_chunks_match_one_groupby():
+    rng = np.random.default_rng(0)
+    keys = pd.Series(rng.integers(0, 8, 500))
+    # a large offset is where a running sum of squares loses the variance
+    values = pd.Series(1e6 + rng.normal(0, 1, 500))
+    values[::13] = np.nan
+    keys[499] = 99  # a key with a single value
+
+    stats = RunningStats()
+    for start in range(0, 500, 64):
+        stats.update(keys[start:start + 64], values[start:start + 64])
+    result = stats.result()
+
+    expected = values.groupby(keys).agg(["count", "mean", "std"])
+    np.testing.assert_array_equal(result.index, expected.index)
+    np.testing.assert_array_equal(result["count"], expected["count"])
+    np.testing.assert_allclose(result["mean"], expected["mean"], rtol=1e-12)
+    np.testing.assert_allclose(result["std"], expected["std"], rtol=1e-6)
+    assert np.isnan(result.loc[99, "std"])
+
+
+def test_calendar_stats_match_the_whole_calendar(tmp_path):
+    rng = np.random.default_rng(1)
+    days = pd.date_range("2023-12-20", "2024-02-10")
+    calendar = pd.DataFrame({
+        "listing_id": np.repeat([1, 2, 3], len(days)),
+        "date": np.tile(days, 3),
+        "price": rng.uniform(40, 200, 3 * len(days)).round(2),
+    })
+    calendar.loc[::7, "price"] = np.nan
+    csv = calendar.assign(
+        available="t",
+        price=calendar["price"].map(lambda price: "" if np.isnan(price) else f"${price:,.2f}"),
+        adjusted_price="",
+    )
+    csv.to_csv(os.path.join(tmp_path, "calendar.csv.gz"), index=False, compression="gzip")
+
+    until = pd.Timestamp("2024-02-01")
+    stats = calendar_stats(str(tmp_path), until=until, chunksize=40)
+
+    calendar = calendar[calendar["date"] < until]
+    per_listing = calendar.groupby("listing_id")["price"].agg(["mean", "std", "count"])
+    np.testing.assert_allclose(stats.price_std["price_mean"], per_listing["mean"], rtol=1e-6)
+    np.testing.assert_allclose(stats.price_std["price_std"], per_listing["std"], rtol=1e-5)
+    np.testing.assert_array_equal(stats.price_std["days"], per_listing["count"])
+
+    for table, freq in [(stats.weekly, "W"), (stats.monthly, "ME")]:
+        expected = calendar.set_index("date")["price"].resample(freq).agg(["mean", "count"])
+        expected = expected[expected["count"] > 0]
+        np.testing.assert_array_equal(table["date"], expected.index)
+        np.testing.assert_allclose(table["avg_price"], expected["mean"], rtol=1e-6)
+        np.testing.assert_array_equal(table["days"], expected["count"])
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+
+from pipeline.data import CACHE_DIR, cache_path, iter_dataset, iter_source, load_calendar
+
+
+def _write_calendar(data_dir, minimum_nights=(1, 2, "", 3, 1)):
+    pd.DataFrame({
+        "listing_id": [1, 1, 2, 2, 3],
+        "date": ["2024-01-01", "2024-01-02", "2024-01-01", "2024-01-02", "2024-01-01"],
+        "available": ["t", "f", "t", "t", "f"],
+        "price": ["$80.00", "$1,200.00", "", "$95.50", "$60.00"],
+        "adjusted_price": ["", "", "", "", ""],
+        "minimum_nights": list(minimum_nights),
+    }).to_csv(os.path.join(data_dir, "calendar.csv.gz"), index=False, compression="gzip")
+
+
+COLUMNS = ["listing_id", "date", "price"]
+
+
+def _cache_files(data_dir):
+    return sorted(os.listdir(os.path.join(data_dir, CACHE_DIR)))
+
+
+def test_iter_dataset_converts_the_csv_while_streaming_it(tmp_path):
+    data_dir = str(tmp_path)
+    # minimum_nights is read as integers in the first chunk and as floats
+    # (with a missing value) in the second, which the cache stores as one type
+    _write_calendar(data_dir)
+    from_source = pd.concat(iter_source("calendar", data_dir, COLUMNS, chunksize=2), ignore_index=True)
+
+    converting = pd.concat(iter_dataset("calendar", data_dir, COLUMNS, chunksize=2), ignore_index=True)
+    pd.testing.assert_frame_equal(converting, from_source)
+    path = cache_path("calendar", data_dir)
+    assert _cache_files(data_dir) == [os.path.basename(path)]
+
+    # the same file load_dataset writes from the whole table
+    converted = pd.read_parquet(path)
+    os.remove(path)
+    pd.testing.assert_frame_equal(converted, load_calendar(data_dir=data_dir))
+
+    chunks = list(iter_dataset("calendar", data_dir, COLUMNS, chunksize=2))
+    from_cache = pd.concat(chunks, ignore_index=True)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(from_cache.columns) == COLUMNS
+    assert from_cache["price"].dtype == "float32"
+    pd.testing.assert_frame_equal(from_cache, from_source, check_dtype=False)
+
+
+def test_iter_dataset_leaves_the_cache_to_load_dataset_when_chunk_types_differ(tmp_path):
+    data_dir = str(tmp_path)
+    # integers in the first chunk, text in the second
+    _write_calendar(data_dir, minimum_nights=(1, 2, "30+", 3, 1))
+    streamed = pd.concat(iter_dataset("calendar", data_dir, chunksize=2), ignore_index=True)
+
+    assert _cache_files(data_dir) == []
+    assert streamed["minimum_nights"].astype(str).tolist() == ["1", "2", "30+", "3", "1"]
+
+
+def test_iter_dataset_keeps_no_partial_cache(tmp_path):
+    data_dir = str(tmp_path)
+    _write_calendar(data_dir)
+    chunks = iter_dataset("calendar", data_dir, COLUMNS, chunksize=2)
+    next(chunks)
+    chunks.close()
+
+    assert _cache_files(data_dir) == []
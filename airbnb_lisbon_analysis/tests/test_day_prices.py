@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.day_prices import DayPrices, day_prices
+
+
+def _merged(listing_ids, dates, calendar):
+    pairs = pd.DataFrame({"listing_id": listing_ids, "date": pd.to_datetime(dates)})
+    first = calendar.drop_duplicates(["listing_id", "date"])
+    return pairs.merge(first, on=["listing_id", "date"], how="left")["price"].to_numpy(dtype=np.float32)
+
+
+def test_day_prices_matches_a_merge_with_the_first_calendar_row():
+    rng = np.random.default_rng(0)
+    # ids far apart, as Airbnb's are
+    listings = np.array([7, 10**17 + 3, 52_000_000_000_000_001])
+    days = pd.date_range("2023-12-25", periods=15)
+    calendar = pd.DataFrame({
+        "listing_id": rng.choice(listings, 60),
+        "date": rng.choice(days, 60),
+        "price": rng.uniform(20, 300, 60).astype(np.float32),
+    })
+    # repeated pairs, and pairs without a calendar row
+    listing_ids = rng.choice(np.append(listings, 11), 40)
+    dates = rng.choice(days, 40)
+
+    expected = _merged(listing_ids, dates, calendar)
+    np.testing.assert_array_equal(day_prices(listing_ids, dates, calendar), expected)
+    np.testing.assert_array_equal(
+        day_prices(listing_ids, dates, (calendar.iloc[start:start + 7] for start in range(0, 60, 7))), expected
+    )
+
+
+def test_day_prices_keeps_the_first_row_across_chunks():
+    lookup = DayPrices([1, 1, 2], ["2024-01-01", "2024-01-01", "2024-01-02"])
+    lookup.update(pd.DataFrame({"listing_id": [3], "date": pd.to_datetime(["2024-01-01"]), "price": [1.0]}))
+    lookup.update(pd.DataFrame({
+        "listing_id": [1, 1], "date": pd.to_datetime(["2024-01-01", "2024-01-01"]), "price": [80.0, 90.0],
+    }))
+    lookup.update(pd.DataFrame({"listing_id": [1], "date": pd.to_datetime(["2024-01-01"]), "price": [70.0]}))
+
+    np.testing.assert_array_equal(lookup.prices(), np.array([80.0, 80.0, np.nan], dtype=np.float32))
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from pipeline.ingest import PARISH_LANGUAGE_FILE, _replace_rows, changed_reviews, ingest
+from pipeline.quarterly import QUARTERLY_FILE, build_parish_quarterly
+
+SOURCES = ["listings.csv.gz", "reviews.csv.gz", "review_languages.csv.gz", "calendar.csv.gz",
+           "lisbon_parishes.geojson"]
+
+
+def _square(west, south, size=0.05):
+    return [[[west, south], [west + size, south], [west + size, south + size], [west, south + size], [west, south]]]
+
+
+def _write_snapshot(data_dir, reviews, languages, calendar=None):
+    parishes = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"id": parish_id}, "geometry": {"type": "Polygon", "coordinates": square}}
+        for parish_id, square in [(1, _square(-9.20, 38.70)), (2, _square(-9.15, 38.70))]
+    ]}
+    with open(os.path.join(data_dir, "lisbon_parishes.geojson"), "w") as fp:
+        json.dump(parishes, fp)
+    pd.DataFrame({
+        "id": [10, 11, 12, 13],
+        "latitude": [38.72, 38.73, 38.72, 38.60],
+        "longitude": [-9.18, -9.17, -9.12, -9.12],
+        "price": ["$80.00", "$90.00", "$120.00", "$60.00"],
+    }).to_csv(os.path.join(data_dir, "listings.csv.gz"), index=False, compression="gzip")
+    pd.DataFrame(reviews, columns=["id", "listing_id", "date"]).to_csv(
+        os.path.join(data_dir, "reviews.csv.gz"), index=False, compression="gzip")
+    pd.DataFrame(languages, columns=["id", "language"]).to_csv(
+        os.path.join(data_dir, "review_languages.csv.gz"), index=False, compression="gzip")
+    if calendar is None:
+        # keep the calendar file (gzip stamps the write time, so rewriting it
+        # would give it a new digest)
+        return
+    calendar = pd.DataFrame(calendar, columns=["listing_id", "date", "price"])
+    calendar["available"] = "t"
+    calendar["adjusted_price"] = ""
+    calendar.to_csv(os.path.join(data_dir, "calendar.csv.gz"), index=False, compression="gzip")
+
+
+def _read_outputs(data_dir):
+    quarterly = pd.read_csv(os.path.join(data_dir, QUARTERLY_FILE))
+    parishes = pd.read_csv(os.path.join(data_dir, PARISH_LANGUAGE_FILE))
+    return quarterly.sort_values(["parish_id", "quarter"], ignore_index=True), parishes.sort_values(
+        "parish_id", ignore_index=True)
+
+
+def _assert_same_as_full_build(data_dir, tmp_path, name):
+    # a run without saved state rebuilds everything
+    full_dir = tmp_path / name
+    full_dir.mkdir()
+    for source in SOURCES:
+        shutil.copy(os.path.join(data_dir, source), full_dir)
+    ingest(str(full_dir))
+
+    quarterly, parishes = _read_outputs(data_dir)
+    full_quarterly, full_parishes = _read_outputs(str(full_dir))
+    pd.testing.assert_frame_equal(quarterly, full_quarterly)
+    pd.testing.assert_frame_equal(parishes, full_parishes)
+
+    built = build_parish_quarterly(data_dir).sort_values(["parish_id", "quarter"], ignore_index=True)
+    pd.testing.assert_frame_equal(quarterly, built, check_dtype=False, rtol=1e-6)
+
+
+def test_changed_reviews_finds_added_removed_and_changed_rows():
+    old = pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "listing_id": [10, 10, 11, 12],
+        "date": pd.to_datetime(["2023-01-01"] * 4),
+        "parish_id": pd.array([1, 1, pd.NA, 2], dtype="Int64"),
+        "language": ["en", "pt", None, "fr"],
+        "price": [80.0, 0.0, 90.0, 120.0],
+    })
+    new = old.copy()
+    new.loc[1, "price"] = 85.0
+    new.loc[3, "language"] = "de"
+    new = pd.concat([new.drop(index=0), old.iloc[[0]].assign(id=5)], ignore_index=True)
+    # missing values equal to missing values are not a change (review 3)
+    assert sorted(changed_reviews(old, new)) == [1, 2, 4, 5]
+
+
+def test_replace_rows_swaps_only_the_touched_keys():
+    stored = pd.DataFrame({"parish_id": [1, 1, 2], "quarter": ["2023Q1", "2023Q2", "2023Q1"], "n": [1, 2, 3]})
+    fresh = pd.DataFrame({"parish_id": [1, 3], "quarter": ["2023Q2", "2023Q1"], "n": [20, 30]})
+    touched = pd.DataFrame({"parish_id": [1, 2, 3], "quarter": ["2023Q2", "2023Q1", "2023Q1"]})
+    result = _replace_rows(stored, fresh, ["parish_id", "quarter"], touched)
+    assert result.values.tolist() == [[1, "2023Q1", 1], [1, "2023Q2", 20], [3, "2023Q1", 30]]
+
+
+REVIEWS = [
+    (1, 10, "2023-01-05"), (2, 10, "2023-02-10"), (3, 11, "2023-01-20"), (4, 12, "2023-04-02"),
+    (5, 12, "2023-05-15"), (6, 13, "2023-05-16"), (7, 11, "2023-07-01"),
+]
+LANGUAGES = [(1, "en"), (2, "pt"), (3, "en"), (4, "fr"), (5, "fr"), (6, "de"), (7, "en")]
+CALENDAR = [
+    (10, "2023-01-05", "$80.00"), (10, "2023-02-10", "$85.00"), (11, "2023-01-20", "$90.00"),
+    (12, "2023-04-02", "$120.00"), (12, "2023-05-15", "$125.00"), (11, "2023-07-01", "$95.00"),
+    (11, "2023-07-02", "$99.00"), (12, "2023-08-01", "$130.00"),
+]
+
+
+def test_incremental_ingest_matches_a_full_rebuild(tmp_path):
+    data_dir = str(tmp_path / "data")
+    os.makedirs(data_dir)
+    _write_snapshot(data_dir, REVIEWS, LANGUAGES, CALENDAR)
+    assert ingest(data_dir)["price_lookups"] == len(REVIEWS)
+    _assert_same_as_full_build(data_dir, tmp_path, "first")
+
+    # review 2 is deleted, 7 moves a day, 8 and 9 are new (9 in a new
+    # quarter) and review 3 is now detected as Portuguese
+    reviews = [review for review in REVIEWS if review[0] not in (2, 7)]
+    reviews += [(7, 11, "2023-07-02"), (8, 10, "2023-02-11"), (9, 12, "2023-08-01")]
+    languages = [(3, "pt")] + [language for language in LANGUAGES if language[0] != 3] + [(8, "de"), (9, "fr")]
+    _write_snapshot(data_dir, reviews, languages)
+    counts = ingest(data_dir)
+    assert counts["price_lookups"] == 3
+    assert counts["changed_reviews"] == 5
+    _assert_same_as_full_build(data_dir, tmp_path, "changed")
+
+    # nothing changed: the calendar is not searched again
+    assert ingest(data_dir)["price_lookups"] == 0
+    _assert_same_as_full_build(data_dir, tmp_path, "unchanged")
+
+    # a new calendar can change the price of any review day
+    calendar = [(listing, day, "$200.00" if (listing, day) == (12, "2023-04-02") else price)
+                for listing, day, price in CALENDAR]
+    _write_snapshot(data_dir, reviews, languages, calendar)
+    counts = ingest(data_dir)
+    assert counts["price_lookups"] == len(reviews)
+    assert counts["changed_reviews"] == 1
+    _assert_same_as_full_build(data_dir, tmp_path, "repriced")
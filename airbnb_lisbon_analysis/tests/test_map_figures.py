@@ -0,0 +1,37 @@
+import pandas as pd
+import plotly.express as px
+
+from pipeline.map_figures import scatter_map_patch
+
+
+def _has_path(figure, location):
+    node = figure
+    for key in location:
+        if isinstance(node, dict) and key in node:
+            node = node[key]
+        elif isinstance(node, list) and isinstance(key, int) and key < len(node):
+            node = node[key]
+        else:
+            return False
+    return True
+
+
+def test_scatter_map_patch_targets_keys_of_the_base_figure():
+    df = pd.DataFrame({
+        "latitude": [38.71, 38.72, 38.75],
+        "longitude": [-9.14, -9.15, -9.10],
+        "avg_price": [80.0, 120.0, 95.0],
+        "review_count": [3, 10, 25],
+        "name": ["a", "b", "c"],
+    })
+    bounds = {"west": -9.2, "east": -9.0, "south": 38.7, "north": 38.8}
+    fig = px.scatter_map(df, lat="latitude", lon="longitude", color="avg_price", size="review_count",
+                         hover_name="name", hover_data=["avg_price", "review_count"])
+    fig.update_layout(map_bounds=bounds)
+
+    patch = scatter_map_patch(df[df["review_count"] >= 10], lat="latitude", lon="longitude", color="avg_price",
+                              size="review_count", hover_name="name", hover_data=["avg_price", "review_count"],
+                              bounds=bounds)
+    base = fig.to_dict()
+    for operation in patch.to_plotly_json()["operations"]:
+        assert _has_path(base, operation["location"]), operation["location"]
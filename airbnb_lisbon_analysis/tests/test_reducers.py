@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.reducers import mode_by
+
+
+def test_mode_by_matches_series_mode():
+    df = pd.DataFrame({
+        "parish_id": [1, 1, 1, 2, 2, 3],
+        "language": ["pt", "en", "en", "fr", "de", None],
+    })
+    modes = mode_by(df, "parish_id")
+    assert modes["language"].to_dict() == {1: "en", 2: "de"}
+    assert modes.loc[1, "share"] == 2 / 3
+    assert modes.loc[1, "runner_up"] == "pt"
+
+
+def test_mode_by_ignores_missing_keys():
+    df = pd.DataFrame({
+        "parish_id": [1.0, np.nan, 1.0, np.nan],
+        "quarter": ["2023Q1", "2023Q1", None, "2023Q2"],
+        "language": ["pt", "en", "en", "fr"],
+    })
+    assert mode_by(df, "parish_id")["language"].to_dict() == {1.0: "en"}
+    assert mode_by(df, ["parish_id", "quarter"])["language"].to_dict() == {(1.0, "2023Q1"): "pt"}
+
+
+def test_mode_by_leaves_out_zero_weight_groups():
+    df = pd.DataFrame({
+        "parish_id": [1, 1, 2, 3],
+        "language": ["pt", "en", "fr", "de"],
+        "num_reviews": [1, 3, 0, np.nan],
+    })
+    modes = mode_by(df, "parish_id", weights="num_reviews")
+    assert modes["language"].to_dict() == {1: "en"}
+    assert modes.loc[1, "share"] == 0.75
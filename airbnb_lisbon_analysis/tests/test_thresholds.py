@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.thresholds import ThresholdIndex
+
+
+def _listings(rng, n=300):
+    df = pd.DataFrame({
+        "review_count": rng.integers(0, 50, n),
+        "latitude": rng.uniform(38.69, 38.80, n),
+        "longitude": rng.uniform(-9.23, -9.09, n),
+    })
+    df.loc[::17, "latitude"] = np.nan
+    return df
+
+
+def test_threshold_index_matches_a_full_scan():
+    df = _listings(np.random.default_rng(0))
+    for frame in (df, df.sort_values("review_count", kind="stable")):
+        index = ThresholdIndex(frame, "review_count")
+        for threshold in (-1, 0, 1, 10, 25.5, 49):
+            passing = df[df["review_count"] >= threshold]
+            at_least = index.at_least(threshold)
+            assert sorted(at_least["review_count"]) == sorted(passing["review_count"])
+            pd.testing.assert_frame_equal(
+                at_least.sort_values(list(df.columns), ignore_index=True),
+                passing.sort_values(list(df.columns), ignore_index=True),
+            )
+            assert index.bounds(threshold, margin=0.01) == {
+                "west": passing["longitude"].min() - 0.01,
+                "east": passing["longitude"].max() + 0.01,
+                "south": passing["latitude"].min() - 0.01,
+                "north": passing["latitude"].max() + 0.01,
+            }
+
+
+def test_threshold_index_has_no_bounds_above_the_maximum():
+    index = ThresholdIndex(_listings(np.random.default_rng(1)), "review_count")
+    assert len(index.at_least(50)) == 0
+    assert index.bounds(50) is None
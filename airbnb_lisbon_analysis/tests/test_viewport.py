@@ -0,0 +1,33 @@
+import numpy as np
+
+from pipeline.viewport import GridIndex
+
+
+def _brute_force(lat, lon, west, east, south, north):
+    return np.flatnonzero((lon >= west) & (lon <= east) & (lat >= south) & (lat <= north))
+
+
+def test_grid_index_matches_a_full_scan():
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(38.69, 38.80, 5000)
+    lon = rng.uniform(-9.23, -9.09, 5000)
+    lat[::97] = np.nan
+    grid = GridIndex(lat, lon)
+    for _ in range(50):
+        west, east = np.sort(rng.uniform(-9.25, -9.07, 2))
+        south, north = np.sort(rng.uniform(38.67, 38.82, 2))
+        np.testing.assert_array_equal(grid.query(west, east, south, north),
+                                      _brute_force(lat, lon, west, east, south, north))
+
+
+def test_grid_index_stores_only_occupied_cells():
+    # one listing geocoded to (0, 0) stretches the grid over millions of cells
+    lat = np.r_[np.linspace(38.70, 38.75, 100), 0.0]
+    lon = np.r_[np.linspace(-9.20, -9.10, 100), 0.0]
+    grid = GridIndex(lat, lon)
+    assert grid.columns * grid.rows > 1_000_000
+    assert len(grid.cells) <= 101
+    np.testing.assert_array_equal(grid.query(-10.0, 1.0, -1.0, 40.0), np.arange(101))
+    np.testing.assert_array_equal(grid.query(-9.3, -9.0, 38.6, 38.8), np.arange(100))
+    np.testing.assert_array_equal(grid.query(-0.01, 0.01, -0.01, 0.01), [100])
+    assert len(grid.query(-5.0, -4.0, 20.0, 21.0)) == 0